@@ -1,35 +1,254 @@
+import aiohttp
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 import json
 from config import get_env_variable
+from metrics import get_metrics
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import logging
+import random
+import threading
 import time
 
 JIRA_URL = get_env_variable("JIRA_URL")
 AUTH = get_env_variable("JIRA_EMAIL"), get_env_variable("JIRA_TOKEN")
 MAX_RETRIES = 5
 RETRY_WAIT_TIME = 2
+RETRY_MAX_WAIT = 60
+MAX_RETRY_AFTER = 300
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RATE_LIMIT = float(get_env_variable("JIRA_RATE_LIMIT", 20))
+RATE_LIMIT_BURST = float(get_env_variable("JIRA_RATE_LIMIT_BURST", 40))
+POOL_SIZE = int(get_env_variable("JIRA_POOL_SIZE", 10))
+ASYNC_CONNECTION_LIMIT = int(get_env_variable("JIRA_ASYNC_CONNECTION_LIMIT", 100))
+
+_session = None
+_session_lock = threading.Lock()
+_async_session = None
+
+class TokenBucket:
+    """
+    Token bucket that paces every Jira request made by the process, from any thread or event loop.
+
+    Args:
+        rate (float): Tokens added per second; 0 or less disables the limit.
+        capacity (float): Maximum number of tokens, i.e. the largest burst allowed.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token and returns how many seconds the caller has to wait before using it.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            if now > self.updated:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.tokens -= 1
+            ready_at = self.updated + max(0.0, -self.tokens) / self.rate
+            return max(0.0, ready_at - now)
+
+    def pause(self, seconds):
+        """
+        Empties the bucket and stops refilling it for the given number of seconds.
+        """
+        if self.rate <= 0:
+            return
+        with self.lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self.updated:
+                self.tokens = min(self.tokens, 0.0)
+                self.updated = resume_at
+
+RATE_LIMITER = TokenBucket(RATE_LIMIT, RATE_LIMIT_BURST)
+
+def is_retryable_status(status_code):
+    """
+    Returns True if a request that failed with this HTTP status may succeed when retried.
+
+    Transport errors have no status code and are always retried; client errors other than 429
+    will fail the same way again and are not.
+    """
+    return status_code is None or status_code in RETRY_STATUS_CODES
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header given in seconds or as an HTTP date.
+
+    Returns:
+        float or None: The number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+def get_retry_wait(attempt, retry_after=None):
+    """
+    Returns how long to wait before the next attempt.
+
+    A Retry-After value from Jira is honored and also pauses the shared rate limiter, so other
+    workers back off too. Otherwise the wait is an exponential backoff with full jitter.
+
+    Args:
+        attempt (int): The zero-based number of the attempt that just failed.
+        retry_after (str): The Retry-After header of the failed response, if any.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+    retry_after_seconds = parse_retry_after(retry_after)
+    if retry_after_seconds is not None:
+        RATE_LIMITER.pause(retry_after_seconds)
+        return retry_after_seconds + random.uniform(0, RETRY_WAIT_TIME)
+    return random.uniform(0, min(RETRY_MAX_WAIT, RETRY_WAIT_TIME * 2 ** attempt))
+
+def get_jira_session():
+    """
+    Returns the shared Jira session, creating it on first use.
+
+    The session keeps connections to Jira alive between requests and can be used from several
+    threads at once; at most POOL_SIZE connections are opened, extra callers wait for a free one.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.auth = HTTPBasicAuth(AUTH[0], AUTH[1])
+                session.headers.update({
+                    "Accept": "application/json",
+                    "Content-Type": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                })
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=True)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
 
 def make_jira_request(method, endpoint, data=None, params=None):
-    headers = {"Accept": "application/json", "Content-Type": "application/json"}
+    session = get_jira_session()
     url = JIRA_URL + endpoint
+    metrics = get_metrics()
     for attempt in range(MAX_RETRIES):
+        time.sleep(RATE_LIMITER.reserve())
+        started = time.perf_counter()
         try:
-            response = requests.request(
+            response = session.request(
                 method,
                 url,
-                headers=headers,
                 data=json.dumps(data) if data else None,
                 params=params,
-                auth=HTTPBasicAuth(AUTH[0], AUTH[1]),
             )
+            metrics.observe_request(method, endpoint, time.perf_counter() - started, response.status_code)
             response.raise_for_status()
             return json.loads(response.text)
         except requests.RequestException as e:
             logging.error(f"JIRA API request failed: {e}")
+            status_code = e.response.status_code if e.response is not None else None
+            if e.response is None:
+                metrics.observe_request(method, endpoint, time.perf_counter() - started, "error")
+            if not is_retryable_status(status_code):
+                logging.error(f"JIRA API request to {endpoint} failed with status {status_code}, not retrying")
+                metrics.count_failure(method, endpoint, status_code or "error")
+                return None
+            if attempt < MAX_RETRIES - 1:
+                retry_after = e.response.headers.get("Retry-After") if e.response is not None else None
+                wait_time = get_retry_wait(attempt, retry_after)
+                logging.info(f"Attempt {attempt + 1} failed, retrying in {wait_time:.1f} seconds...")
+                metrics.count_retry(method, endpoint, status_code or "error")
+                time.sleep(wait_time)
+            else:
+                logging.error(f"JIRA API request failed after {MAX_RETRIES} attempts: {e}")
+                metrics.count_failure(method, endpoint, status_code or "error")
+                return None
+
+def get_async_jira_session():
+    """
+    Returns the shared aiohttp session for the running event loop, creating it on first use.
+
+    At most ASYNC_CONNECTION_LIMIT connections are open at once; further requests wait for one.
+    Must be called from inside the event loop, and closed with close_async_jira_session.
+
+    Returns:
+        aiohttp.ClientSession: The shared session.
+    """
+    global _async_session
+    if _async_session is None or _async_session.closed:
+        _async_session = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(AUTH[0], AUTH[1]),
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+            connector=aiohttp.TCPConnector(limit=ASYNC_CONNECTION_LIMIT),
+        )
+    return _async_session
+
+async def close_async_jira_session():
+    """
+    Closes the shared aiohttp session, if one is open.
+    """
+    global _async_session
+    if _async_session is not None:
+        await _async_session.close()
+        _async_session = None
+
+async def make_jira_request_async(method, endpoint, data=None, params=None):
+    """
+    Async version of make_jira_request with the same retries and return value.
+    """
+    session = get_async_jira_session()
+    url = JIRA_URL + endpoint
+    metrics = get_metrics()
+    for attempt in range(MAX_RETRIES):
+        await asyncio.sleep(RATE_LIMITER.reserve())
+        started = time.perf_counter()
+        try:
+            async with session.request(
+                method,
+                url,
+                data=json.dumps(data) if data else None,
+                params=params,
+            ) as response:
+                metrics.observe_request(method, endpoint, time.perf_counter() - started, response.status)
+                response.raise_for_status()
+                return json.loads(await response.text())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"JIRA API request failed: {e}")
+            status_code = e.status if isinstance(e, aiohttp.ClientResponseError) else None
+            if status_code is None:
+                metrics.observe_request(method, endpoint, time.perf_counter() - started, "error")
+            if not is_retryable_status(status_code):
+                logging.error(f"JIRA API request to {endpoint} failed with status {status_code}, not retrying")
+                metrics.count_failure(method, endpoint, status_code or "error")
+                return None
             if attempt < MAX_RETRIES - 1:
-                logging.info(f"Attempt {attempt + 1} failed, retrying in {RETRY_WAIT_TIME} seconds...")
-                time.sleep(RETRY_WAIT_TIME)
+                retry_after = e.headers.get("Retry-After") if isinstance(e, aiohttp.ClientResponseError) and e.headers else None
+                wait_time = get_retry_wait(attempt, retry_after)
+                logging.info(f"Attempt {attempt + 1} failed, retrying in {wait_time:.1f} seconds...")
+                metrics.count_retry(method, endpoint, status_code or "error")
+                await asyncio.sleep(wait_time)
             else:
                 logging.error(f"JIRA API request failed after {MAX_RETRIES} attempts: {e}")
+                metrics.count_failure(method, endpoint, status_code or "error")
                 return None
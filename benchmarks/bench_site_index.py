@@ -0,0 +1,81 @@
+"""
+Compares the CIDR site index against the original octet-based site lookup.
+
+Usage:
+    python benchmarks/bench_site_index.py [--objects N] [--ips-per-object N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from site_index import SitePrefixIndex, SITE_PREFIXES_FILE
+
+LEGACY_SITE_MAP = {
+    "10": {
+        "64": "IND-A",
+        "1": "MTL-A", "2": "MTL-A", "3": "MTL-A", "4": "MTL-A", "51": "MTL-A",
+        "39": "TEM-A", "33": "TEM-A", "32": "TEM-A", "35": "TEM-A",
+        "16": "QUE-A", "18": "QUE-A", "31": "QUE-A",
+        "60": "TOR-A", "48": "TOR-A",
+        "242": "TWN-A",
+    },
+    "172": {
+        "16": "MTL-A", "17": "MTL-A",
+    },
+}
+
+def legacy_decide_site_from_ip(ip_list):
+    """
+    The octet-based lookup decide_site_from_ip used before the site index, which rebuilt its site
+    map on every call.
+    """
+    site_map = {first: dict(seconds) for first, seconds in LEGACY_SITE_MAP.items()}
+    for ip in ip_list:
+        ip_octets = ip.split(".")
+        if len(ip_octets) != 4:
+            continue
+        first_octet, second_octet = ip_octets[0], ip_octets[1]
+        if first_octet in site_map and second_octet in site_map[first_octet]:
+            return (site_map[first_octet][second_octet], ip)
+    return (None, None)
+
+def random_ip(rng):
+    """
+    Returns an IP that lands in a known site about half the time.
+    """
+    if rng.random() < 0.5:
+        first = rng.choice(list(LEGACY_SITE_MAP))
+        second = rng.choice(list(LEGACY_SITE_MAP[first]))
+    else:
+        first, second = str(rng.choice([10, 172, 192])), str(rng.randint(0, 255))
+    return f"{first}.{second}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=10000)
+    parser.add_argument("--ips-per-object", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    ip_lists = [[random_ip(rng) for _ in range(args.ips_per_object)] for _ in range(args.objects)]
+    index = SitePrefixIndex.from_file(SITE_PREFIXES_FILE)
+
+    mismatches = sum(1 for ip_list in ip_lists if legacy_decide_site_from_ip(ip_list) != index.decide(ip_list))
+    print(f"{args.objects} objects, {args.ips_per_object} IPs each, {mismatches} mismatches")
+
+    build = min(timeit.repeat(lambda: SitePrefixIndex.from_file(SITE_PREFIXES_FILE), number=1, repeat=args.repeat))
+    legacy = min(timeit.repeat(lambda: [legacy_decide_site_from_ip(ip_list) for ip_list in ip_lists], number=1, repeat=args.repeat))
+    single = min(timeit.repeat(lambda: [index.decide(ip_list) for ip_list in ip_lists], number=1, repeat=args.repeat))
+    batch = min(timeit.repeat(lambda: index.decide_many(ip_lists), number=1, repeat=args.repeat))
+
+    print(f"index build:      {build * 1e3:8.3f} ms")
+    for name, seconds in (("legacy lookup", legacy), ("index decide", single), ("index decide_many", batch)):
+        print(f"{name + ':':18}{seconds * 1e3:8.3f} ms  ({seconds / args.objects * 1e6:.2f} us/object)")
+
+if __name__ == "__main__":
+    main()
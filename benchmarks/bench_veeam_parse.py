@@ -0,0 +1,115 @@
+"""
+Compares the Veeam report parsers: the original per-server search, the single-pass tree parse and
+the streaming parse.
+
+Usage:
+    python benchmarks/bench_veeam_parse.py [--servers N] [--vms-per-server N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+os.environ.setdefault("VEEAM_PASSWORD", "benchmark")
+
+from bs4 import BeautifulSoup
+from veeam import BackupReportParser, decode_chunks, parse_backup_report, REPORT_CHUNK_SIZE
+from veeam_report import build_report
+
+def legacy_parse_backup_report(soup):
+    """
+    The parse veeam_get_backup_report did before parse_backup_report: one document search per
+    server, then a find_next() walk to the next server header or the end of the document.
+    """
+    def find_tables_between_tags(start_tag, end_tag_name="p"):
+        tables = []
+        current_tag = start_tag.find_next()
+        while current_tag and current_tag.name != end_tag_name:
+            if current_tag.name == "table":
+                tables.append(current_tag)
+            current_tag = current_tag.find_next()
+        return tables
+
+    def find_tables_until_end(tag):
+        tables = []
+        current_tag = tag.find_next()
+        while current_tag:
+            if current_tag.name == "table":
+                tables.append(current_tag)
+            current_tag = current_tag.find_next()
+        return tables
+
+    server_names = [tag.get_text(strip=True).split(" ")[0] for tag in soup.find_all("p")]
+    final_backup_locations = {}
+    for index, server_name in enumerate(server_names):
+        server_tag = soup.find("p", string=lambda text: server_name in text)
+        if not server_tag:
+            continue
+        if index == len(server_names) - 1:
+            tables = find_tables_until_end(server_tag)
+        else:
+            tables = find_tables_between_tags(server_tag)
+        for vm_table in tables:
+            for row in vm_table.find_all("tr")[1:]:
+                vm_name_cell = row.find("td")
+                if vm_name_cell:
+                    vm_name = vm_name_cell.get_text(strip=True).lower().replace(".hypertec-group.com", "")
+                    final_backup_locations[vm_name] = server_name
+    return server_names, final_backup_locations
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def iter_chunks(data, chunk_size):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+def tree_parse(data):
+    return parse_backup_report(BeautifulSoup(data.decode("utf-8"), "html.parser"))[1]
+
+def stream_parse(data, chunk_size=REPORT_CHUNK_SIZE):
+    return dict(BackupReportParser().iter_pairs(decode_chunks(iter_chunks(data, chunk_size))))
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", type=int, default=40)
+    parser.add_argument("--vms-per-server", type=int, default=250)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    html, expected = build_report(args.servers, args.vms_per_server)
+    data = html.encode("utf-8")
+    print(f"{args.servers} servers, {len(expected)} VMs, {len(data) / 1e6:.1f} MB of HTML")
+
+    tree_seconds, soup = best_time(lambda: BeautifulSoup(html, "html.parser"), args.repeat)
+    legacy_seconds, (_, legacy_result) = best_time(lambda: legacy_parse_backup_report(soup), args.repeat)
+    single_seconds, (_, result) = best_time(lambda: parse_backup_report(soup), args.repeat)
+    stream_seconds, stream_result = best_time(lambda: stream_parse(data), args.repeat)
+
+    print(f"same result as legacy: {result == legacy_result}, matches report: {result == expected}")
+    print(f"stream matches report: {stream_result == expected}, with 7 byte chunks: {stream_parse(data, 7) == expected}")
+    print(f"html.parser tree:  {tree_seconds:8.3f} s")
+    print(f"legacy parse:      {legacy_seconds:8.3f} s  (+ tree)")
+    print(f"single-pass parse: {single_seconds:8.3f} s  (+ tree)")
+    print(f"streaming parse:   {stream_seconds:8.3f} s")
+
+    print(f"peak memory, tree mode:   {peak_memory(lambda: tree_parse(data)) / 1e6:8.1f} MB")
+    print(f"peak memory, stream mode: {peak_memory(lambda: stream_parse(data)) / 1e6:8.1f} MB")
+
+if __name__ == "__main__":
+    main()
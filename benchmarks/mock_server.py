@@ -0,0 +1,385 @@
+"""
+Local stand-in for the Jira Assets and Veeam endpoints the scripts call, for offline benchmarks.
+
+Serves /object/navlist/aql, /object/{id}/attributes, /object/aql, /object/create and
+PUT /object/{id} for Jira, and the login, home page and monthly report endpoints for Veeam, from
+a synthetic inventory. Writes are applied to the inventory, so a second run sees the first one's
+changes. Every request can be delayed and answered with 429 at a configurable rate.
+
+Usage:
+    python benchmarks/mock_server.py [--objects N] [--latency SECONDS] [--rate-429 FRACTION] [--port N]
+"""
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+
+# Environment the scripts need to run against the mock inventory
+ENVIRONMENT = {
+    "JIRA_EMAIL": "benchmark", "JIRA_TOKEN": "benchmark", "OBJECT_SCHEMA": "1",
+    "OBJECT_TYPE_ID_DICT": "{'host': '10', 'virtual guest': '20', 'device': '30'}",
+    "JIRA_HOST_ATTRIBUTE_ID": "101", "JIRA_HOST_STATUS_ATTRIBUTE_ID": "102",
+    "HOST_NAME_ATTRIBUTE_ID": "103", "HOST_NETWORK_ATTRIBUTE_ID": "104", "HOST_SITE_ATTRIBUTE_ID": "105",
+    "HOST_OS_ATTRIBUTE_ID": "106", "HOST_DEVICE_TYPE_ATTRIBUTE_ID": "107", "HOST_MODEL_ATTRIBUTE_ID": "108",
+    "JIRA_GUESTVM_ATTRIBUTE_ID": "201", "JIRA_GUESTVM_STATUS_ATTRIBUTE_ID": "202",
+    "GUESTVM_NAME_ATTRIBUTE_ID": "203", "GUESTVM_NETWORK_ATTRIBUTE_ID": "204", "GUESTVM_SITE_ATTRIBUTE_ID": "205",
+    "GUESTVM_OS_ATTRIBUTE_ID": "206", "GUESTVM_DEVICE_TYPE_ATTRIBUTE_ID": "207",
+    "DEVICE_NAME_ATTRIBUTE_ID": "303", "DEVICE_NETWORK_ATTRIBUTE_ID": "304", "DEVICE_SITE_ATTRIBUTE_ID": "305",
+    "DEVICE_DEVICE_TYPE_ATTRIBUTE_ID": "307", "DEVICE_MODEL_ATTRIBUTE_ID": "308",
+    "NETWORK_OBJECT_NAME_ATTRIBUTE_ID": "3601", "NETWORK_OBJECT_IP4_ATTRIBUTE_ID": "3602",
+    "VIRTUAL_WORKSTATION_ID": "901", "SERVER_ID": "902", "COMPUTER_ID": "903", "AP_ID": "904",
+    "CAMERA_ID": "905", "CONTROLLER_ID": "906", "FIREWALL_ID": "907", "IMPI_ID": "908",
+    "SWITCH_ID": "909", "PDU_ID": "910", "PRINTER_ID": "911", "UPS_ID": "912",
+    "VEEAM_USERNAME": "benchmark", "VEEAM_PASSWORD": "benchmark",
+    # Not UTC, so a watermark written in the wrong time zone selects the wrong objects
+    "JIRA_TIMEZONE": "America/Toronto",
+}
+
+OBJECT_TYPES = {
+    "10": {"label": "Host", "prefix": "srv", "name": "103", "network": "104", "site": "105", "os": "106", "device_type": "107", "model": "108", "backup": "101", "status": "102"},
+    "20": {"label": "Virtual Guest", "prefix": "vm", "name": "203", "network": "204", "site": "205", "os": "206", "device_type": "207", "backup": "201", "status": "202"},
+    "30": {"label": "Device", "prefix": "dev", "name": "303", "network": "304", "site": "305", "device_type": "307", "model": "308"},
+}
+NETWORK_TYPE_ID = "36"
+SITES = {"50": "MTL-A", "54": "TEM-A", "52": "QUE-A", "55": "TOR-A", "49": "IND-A", "56": "TWN-A"}
+SITE_NETWORKS = ["10.1", "10.33", "10.16", "10.60", "10.64", "10.242", "192.168"]
+DEVICE_TYPES = {"901": "virtual workstation", "902": "server", "903": "computer"}
+OPERATING_SYSTEMS = ["Ubuntu 22.04", "Windows 10 Pro", "Windows Server 2019", "CentOS 7", "FreeBSD"]
+INSTALL_STATUSES = ["In Use", "In Use", "In Use", "Retired"]
+BACKUP_SERVERS = 20
+CSRF_TOKEN = "benchmark-token"
+# The inventory's objects were last updated at random times over this many days
+INVENTORY_AGE_DAYS = 30
+UPDATED_FILTER_PATTERN = re.compile(r'updated > "([^"]+)"')
+
+def offline_dns_answer(host_name):
+    """
+    The address the offline DNS of the benchmarks and tests gives a hostname: every other name
+    resolves into a known site network.
+    """
+    number = int("".join(character for character in host_name if character.isdigit()) or 0)
+    return f"10.1.{number % 256}.{number // 256 % 254 + 1}" if number % 2 else None
+
+def offline_dns_query(resolver, host_name):
+    """
+    Stands in for DnsResolver.query, answering with offline_dns_answer.
+    """
+    return offline_dns_answer(host_name)
+
+class MockInventory:
+    """
+    The synthetic Jira Assets inventory and Veeam report behind the mock server.
+
+    Args:
+        objects (int): Objects per object type.
+        seed (int): Seed of the random inventory, so every run sees the same data.
+    """
+
+    def __init__(self, objects=1000, seed=0):
+        rng = random.Random(seed)
+        self.throttle_rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.counts = collections.Counter()
+        self.sessions = set()
+        next_id = 1000
+        network_objects = {}
+        vm_names = []
+        for type_id, fields in OBJECT_TYPES.items():
+            for number in range(objects):
+                next_id += 1
+                object_id = str(next_id)
+                name = f"{fields['prefix']}{number:05d}"
+                attributes = {fields["name"]: [{"value": name, "displayValue": name}]}
+                # Two thirds of the objects have an IP in Jira, the others need a DNS lookup
+                if number % 3:
+                    ip_address = f"{rng.choice(SITE_NETWORKS)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                    if ip_address not in network_objects and rng.random() < 0.5:
+                        next_id += 1
+                        network_objects[ip_address] = str(next_id)
+                    attributes[fields["network"]] = [{"value": network_objects.get(ip_address, ip_address), "displayValue": ip_address}]
+                else:
+                    # Half of the addresses found by DNS already have a network object to reuse
+                    ip_address = offline_dns_answer(name)
+                    if ip_address is not None and ip_address not in network_objects and number % 4 == 1:
+                        next_id += 1
+                        network_objects[ip_address] = str(next_id)
+                if rng.random() < 0.5:
+                    site_id = rng.choice(list(SITES))
+                    attributes[fields["site"]] = [{"value": site_id, "displayValue": SITES[site_id]}]
+                if "os" in fields:
+                    operating_system = rng.choice(OPERATING_SYSTEMS)
+                    attributes[fields["os"]] = [{"value": operating_system, "displayValue": operating_system}]
+                if "model" in fields:
+                    attributes[fields["model"]] = [{"value": "Model X", "displayValue": "Model X"}]
+                if "status" in fields:
+                    status = rng.choice(INSTALL_STATUSES)
+                    attributes[fields["status"]] = [{"value": status, "displayValue": status}]
+                    vm_names.append(name)
+                    if rng.random() < 0.5:
+                        server = f"VBR{rng.randrange(BACKUP_SERVERS):03d}"
+                        attributes[fields["backup"]] = [{"value": server, "displayValue": server}]
+                self.add(object_id, type_id, name, attributes)
+        for ip_address, object_id in network_objects.items():
+            self.add(object_id, NETWORK_TYPE_ID, ip_address, {
+                ENVIRONMENT["NETWORK_OBJECT_NAME_ATTRIBUTE_ID"]: [{"value": ip_address, "displayValue": ip_address}],
+                ENVIRONMENT["NETWORK_OBJECT_IP4_ATTRIBUTE_ID"]: [{"value": ip_address, "displayValue": ip_address}],
+            })
+        self.next_id = next_id
+        self.report = build_veeam_report(vm_names, rng)
+        # A separate generator, so the ages do not change the rest of the seeded inventory
+        age_rng = random.Random(seed + 1)
+        now = time.time()
+        for jira_object in self.objects.values():
+            jira_object["updated"] = now - age_rng.uniform(0, INVENTORY_AGE_DAYS * 24 * 3600)
+
+    def add(self, object_id, type_id, label, attributes):
+        self.objects[object_id] = {"id": object_id, "label": label, "type_id": type_id, "attributes": attributes, "updated": time.time()}
+
+    def attribute_list(self, jira_object, attribute_ids=None):
+        return [
+            {"objectTypeAttributeId": attribute_id, "objectAttributeValues": values}
+            for attribute_id, values in jira_object["attributes"].items()
+            if attribute_ids is None or attribute_id in attribute_ids
+        ]
+
+    def display_value(self, value):
+        """
+        Returns the display value Jira would show for a value written by reference.
+        """
+        value = str(value)
+        if value in SITES:
+            return SITES[value]
+        if value in DEVICE_TYPES:
+            return DEVICE_TYPES[value]
+        referenced = self.objects.get(value)
+        return referenced["label"] if referenced else value
+
+    def navlist(self, payload):
+        type_id = str(payload["objectTypeId"])
+        page_size = int(payload.get("resultsPerPage", 25))
+        page = int(payload.get("page", 1))
+        # Jira reads the updated filter in the account's time zone, to the minute
+        updated_filter = UPDATED_FILTER_PATTERN.search(payload.get("qlQuery", ""))
+        updated_after = None
+        if updated_filter:
+            updated_after = datetime.strptime(updated_filter.group(1), "%Y-%m-%d %H:%M").replace(
+                tzinfo=ZoneInfo(ENVIRONMENT["JIRA_TIMEZONE"])
+            ).timestamp()
+        with self.lock:
+            matches = [
+                jira_object for jira_object in self.objects.values()
+                if jira_object["type_id"] == type_id and (updated_after is None or jira_object["updated"] > updated_after)
+            ]
+        attribute_ids = {str(attribute_id) for attribute_id in payload.get("attributesToDisplay", {}).get("attributesToDisplayIds", [])}
+        entries = []
+        for jira_object in matches[(page - 1) * page_size:page * page_size]:
+            entry = {"id": jira_object["id"], "label": jira_object["label"], "updated": format_updated(jira_object["updated"])}
+            if payload.get("includeAttributes"):
+                entry["attributes"] = self.attribute_list(jira_object, attribute_ids)
+            entries.append(entry)
+        return {"objectEntries": entries, "pageSize": max(1, -(-len(matches) // page_size)), "totalFilterCount": len(matches)}
+
+    def aql(self, payload):
+        match = re.search(r'objectType = "([^"]+)" AND "Name" LIKE "([^"]*)"', payload.get("qlQuery", ""))
+        if match is None:
+            return {"values": []}
+        type_ids = [type_id for type_id, fields in OBJECT_TYPES.items() if fields["label"] == match.group(1)]
+        name = match.group(2).lower()
+        with self.lock:
+            values = sorted(
+                (jira_object for jira_object in self.objects.values() if jira_object["type_id"] in type_ids and name in jira_object["label"].lower()),
+                key=lambda jira_object: jira_object["label"],
+            )
+        return {"values": [{"id": jira_object["id"], "label": jira_object["label"]} for jira_object in values[:25]]}
+
+    def create(self, payload):
+        with self.lock:
+            self.next_id += 1
+            object_id = str(self.next_id)
+            attributes = {
+                str(attribute["objectTypeAttributeId"]): [dict(value, displayValue=value["value"]) for value in attribute["objectAttributeValues"]]
+                for attribute in payload.get("attributes", [])
+            }
+            label = next(iter(attributes.values()), [{"value": object_id}])[0]["value"]
+            self.add(object_id, str(payload.get("objectTypeId")), label, attributes)
+        return {"id": object_id, "label": label}
+
+    def update(self, object_id, payload):
+        with self.lock:
+            jira_object = self.objects.get(object_id)
+            if jira_object is None:
+                return None
+            for attribute in payload.get("attributes", []):
+                jira_object["attributes"][str(attribute["objectTypeAttributeId"])] = [
+                    dict(value, displayValue=value.get("displayValue") or self.display_value(value["value"]))
+                    for value in attribute["objectAttributeValues"]
+                ]
+            jira_object["updated"] = time.time()
+        return {"id": object_id}
+
+def format_updated(timestamp):
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(timestamp))
+
+def build_veeam_report(vm_names, rng):
+    """
+    Builds a Veeam monthly report that lists most of the inventory's hosts and guests, plus a few
+    VMs Jira does not know, under BACKUP_SERVERS backup servers.
+    """
+    servers = collections.defaultdict(list)
+    for vm_name in vm_names:
+        if rng.random() < 0.9:
+            servers[f"VBR{rng.randrange(BACKUP_SERVERS):03d}"].append(vm_name + (".hypertec-group.com" if rng.random() < 0.3 else ""))
+    for number in range(max(1, len(vm_names) // 100)):
+        servers[f"VBR{rng.randrange(BACKUP_SERVERS):03d}"].append(f"unknown{number:04d}")
+    parts = ["<html><body>"]
+    for server_name in sorted(servers):
+        parts.append(f"<p>{server_name} (Backup Server)</p><table><tr><th>Name</th><th>Instances</th></tr>")
+        parts.extend(f"<tr><td>{vm_name}</td><td>1</td></tr>" for vm_name in servers[server_name])
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Without this, small keep-alive responses stall on Nagle's algorithm and delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def throttled(self, route):
+        """
+        Counts the request, applies the configured latency, and answers 429 at the configured rate.
+        """
+        server = self.server
+        inventory = server.inventory
+        with inventory.lock:
+            inventory.counts[route] += 1
+            throttle = server.rate_429 and inventory.throttle_rng.random() < server.rate_429
+            if throttle:
+                inventory.counts["429"] += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if throttle:
+            self.send(429, {}, headers={"Retry-After": "0.1"})
+            return True
+        return False
+
+    def session_id(self):
+        cookies = self.headers.get("Cookie") or ""
+        for cookie in cookies.split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == "session":
+                return value
+        return None
+
+    def do_GET(self):
+        inventory = self.server.inventory
+        match = re.fullmatch(r"/object/(\d+)/attributes", self.path)
+        if match:
+            if self.throttled("GET /object/{id}/attributes"):
+                return
+            jira_object = inventory.objects.get(match.group(1))
+            return self.send(200, inventory.attribute_list(jira_object)) if jira_object else self.send(404, {})
+        if self.path in ("", "/"):
+            self.throttled("GET veeam home")
+            if self.session_id() in inventory.sessions:
+                return self.send(200, f"<html><script>var CSRFToken = '{CSRF_TOKEN}';</script></html>".encode(), "text/html")
+            return self.send(200, b"<html>login</html>", "text/html")
+        self.send(404, {})
+
+    def do_POST(self):
+        inventory = self.server.inventory
+        body = self.read_body()
+        if self.path.startswith("/api/Login/LoginByPassword"):
+            self.throttled("POST veeam login")
+            session = uuid.uuid4().hex
+            inventory.sessions.add(session)
+            return self.send(200, {"success": True}, headers={"Set-Cookie": f"session={session}; Path=/"})
+        if self.path.startswith("/api/Licensing/CreateMonthlyReportPreview"):
+            self.throttled("POST veeam report")
+            if self.session_id() not in inventory.sessions or self.headers.get("X-Csrf-Token") != CSRF_TOKEN:
+                return self.send(401, {})
+            return self.send(200, inventory.report, "text/html; charset=utf-8")
+
+        routes = {
+            "/object/navlist/aql": ("POST /object/navlist/aql", inventory.navlist),
+            "/object/aql": ("POST /object/aql", inventory.aql),
+            "/object/create": ("POST /object/create", inventory.create),
+        }
+        route, handler = routes.get(self.path.split("?")[0], (None, None))
+        if route is None:
+            return self.send(404, {})
+        if self.throttled(route):
+            return
+        self.send(200, handler(json.loads(body or b"{}")))
+
+    def do_PUT(self):
+        body = self.read_body()
+        match = re.fullmatch(r"/object/(\d+)", self.path)
+        if not match:
+            return self.send(404, {})
+        if self.throttled("PUT /object/{id}"):
+            return
+        response = self.server.inventory.update(match.group(1), json.loads(body or b"{}"))
+        self.send(200, response) if response else self.send(404, {})
+
+def start_server(inventory, port=0, latency=0.0, rate_429=0.0):
+    """
+    Serves the inventory on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; its URL is http://127.0.0.1:<server.server_port>.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockRequestHandler)
+    server.daemon_threads = True
+    server.inventory = inventory
+    server.latency = latency
+    server.rate_429 = rate_429
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000, help="objects per object type")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    server = start_server(MockInventory(args.objects), args.port, args.latency, args.rate_429)
+    print(f"Serving {len(server.inventory.objects)} objects on http://127.0.0.1:{server.server_port}, Ctrl+C to stop")
+    print("Environment:")
+    for name, value in ENVIRONMENT.items():
+        print(f"  {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Runs the Jira and Veeam workflows against the local mock server and reports wall time, requests per
+object and peak RSS, optionally checking them against a saved baseline.
+
+Each scenario runs in a fresh Python process against a fresh copy of the mock inventory, so peak
+RSS is the scenario's own and no scenario sees another's writes. DNS lookups are answered offline.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--objects N] [--workers N] [--latency SECONDS] [--rate-429 FRACTION]
+        [--scenarios NAME,...] [--baseline PATH] [--save-baseline] [--tolerance FRACTION]
+"""
+from datetime import datetime, timedelta, timezone
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from mock_server import ENVIRONMENT, MockInventory, offline_dns_query, start_server
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+OBJECT_TYPES = ["host", "device", "virtual guest"]
+SCENARIOS = ["site-sync", "site-sync-async", "site-sync-incremental", "site-sync-cached", "site-plan", "veeam-report", "veeam-reconcile", "veeam-reconcile-search"]
+METRICS = ["wall_seconds", "requests_per_object", "peak_rss_mb"]
+
+def run_scenario(scenario, workers):
+    """
+    Runs one scenario in this process.
+
+    Returns:
+        int: The number of objects or VMs the scenario processed, for the per-object request rate.
+    """
+    import asyncio
+    import logging
+    import dns_resolver
+    import main
+    from jira_utils import configure_inventory_cache, jira_load_hostname_index
+    from veeam import configure_report_cache, veeam_get_backup_report
+
+    logging.getLogger().setLevel(logging.DEBUG)
+    dns_resolver.DnsResolver.query = offline_dns_query
+    configure_inventory_cache(None)
+    dns_resolver.configure_resolver(None)
+    configure_report_cache(None)
+
+    if scenario == "site-sync":
+        for object_type in OBJECT_TYPES:
+            main.jira_update_site_location(object_type, workers)
+    elif scenario == "site-sync-incremental":
+        # The mock inventory was updated over 30 days, so about one object in 30 is this recent
+        updated_since = datetime.now(timezone.utc) - timedelta(days=1)
+        for object_type in OBJECT_TYPES:
+            main.jira_update_site_location(object_type, workers, updated_since)
+    elif scenario == "site-sync-cached":
+        # The cost --inventory-cache adds to a sweep; every page is written to the cache
+        with tempfile.TemporaryDirectory() as cache_dir:
+            configure_inventory_cache(os.path.join(cache_dir, "inventory_cache.sqlite3"))
+            for object_type in OBJECT_TYPES:
+                main.jira_update_site_location(object_type, workers)
+            configure_inventory_cache(None)
+    elif scenario == "site-sync-async":
+        asyncio.run(main.run_site_location_update_async(OBJECT_TYPES, workers))
+    elif scenario == "site-plan":
+        with tempfile.TemporaryDirectory() as plan_dir:
+            main.run_site_location_plan(OBJECT_TYPES, workers, os.path.join(plan_dir, "plan.json"), True, None)
+    else:
+        report = veeam_get_backup_report()
+        if scenario == "veeam-reconcile":
+            hostname_index = jira_load_hostname_index()
+            for vm_name in report:
+                main.process_vm(vm_name, report, [], hostname_index)
+        elif scenario == "veeam-reconcile-search":
+            for vm_name in report:
+                main.process_vm(vm_name, report, [])
+        return len(report)
+    return None
+
+def run_child(args):
+    """
+    Entry point of the scenario process; writes its measurements to args.result_file.
+    """
+    import logging
+    import resource
+
+    log_file = os.path.join(tempfile.gettempdir(), f"benchmark-{args.child}.log")
+    logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s",
+                        handlers=[logging.FileHandler(log_file, mode="w")])
+    started = time.perf_counter()
+    objects = run_scenario(args.child, args.workers)
+    wall_seconds = time.perf_counter() - started
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with open(args.result_file, "w") as result_file:
+        json.dump({"wall_seconds": wall_seconds, "peak_rss_mb": peak_rss_mb, "objects": objects}, result_file)
+
+def run_benchmarks(args):
+    """
+    Runs every selected scenario against its own fresh mock inventory.
+
+    Returns:
+        dict: The measurements of each scenario.
+    """
+    server = start_server(MockInventory(args.objects), latency=args.latency, rate_429=args.rate_429)
+    url = f"http://127.0.0.1:{server.server_port}"
+    env = dict(os.environ, **ENVIRONMENT, JIRA_URL=url, VEEAM_URL=url, JIRA_RATE_LIMIT=str(args.rate_limit))
+    results = {}
+    with tempfile.TemporaryDirectory() as result_dir:
+        for scenario in args.scenarios:
+            server.inventory = MockInventory(args.objects)
+            result_path = os.path.join(result_dir, f"{scenario}.json")
+            command = [sys.executable, os.path.realpath(__file__), "--child", scenario, "--workers", str(args.workers), "--result-file", result_path]
+            completed = subprocess.run(command, env=env, cwd=REPO_DIR, stdout=subprocess.DEVNULL)
+            if completed.returncode != 0:
+                print(f"{scenario}: failed with exit code {completed.returncode}")
+                continue
+            with open(result_path) as result_file:
+                result = json.load(result_file)
+            counts = server.inventory.counts
+            objects = result.pop("objects") or args.objects * len(OBJECT_TYPES)
+            requests = sum(count for route, count in counts.items() if route != "429")
+            result.update({"objects": objects, "requests": requests, "requests_per_object": requests / objects, "requests_by_route": dict(counts)})
+            results[scenario] = result
+            print(
+                f"{scenario:24} {result['wall_seconds']:8.2f} s  {requests:7d} requests"
+                f"  {result['requests_per_object']:6.2f} per object  {result['peak_rss_mb']:7.1f} MB peak RSS"
+            )
+    server.shutdown()
+    return results
+
+def check_regressions(results, baseline, tolerance):
+    """
+    Compares the results with a baseline.
+
+    Returns:
+        list: A description of every metric that got worse than the baseline by more than the tolerance.
+    """
+    regressions = []
+    for scenario, result in results.items():
+        expected = baseline.get(scenario)
+        if expected is None:
+            continue
+        for metric in METRICS:
+            if result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(f"{scenario} {metric}: {result[metric]:.2f} against {expected[metric]:.2f} in the baseline")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000, help="objects per object type in the mock inventory")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the mock server adds to every request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests the mock server answers with 429")
+    parser.add_argument("--rate-limit", type=float, default=0, help="JIRA_RATE_LIMIT for the scripts, 0 for none")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args)
+
+    args.scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    settings = {"objects": args.objects, "workers": args.workers, "latency": args.latency, "rate_429": args.rate_429, "rate_limit": args.rate_limit}
+    results = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"settings": settings, "results": results}, output_file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump({"settings": settings, "results": results}, baseline_file, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline["settings"] != settings:
+        print(f"Not comparing with {args.baseline}, it was recorded with different settings: {baseline['settings']}")
+        return
+    regressions = check_regressions(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
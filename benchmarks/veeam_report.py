@@ -0,0 +1,30 @@
+"""
+Builds synthetic Veeam monthly licensing reports for the benchmarks.
+"""
+import random
+
+def build_report(servers=20, vms_per_server=250, tables_per_server=2, seed=0):
+    """
+    Builds a report in the layout of CreateMonthlyReportPreview: one <p> header per backup server,
+    each followed by tables whose first column holds the VM names.
+
+    Returns:
+        tuple: The report HTML, and the {vm_name: server_name} mapping it should parse to.
+    """
+    rng = random.Random(seed)
+    parts = ["<html><head><title>Monthly Report</title></head><body>", "<table><tr><th>Summary</th></tr><tr><td>ignored</td></tr></table>"]
+    expected = {}
+    vm_number = 0
+    for server in range(servers):
+        server_name = f"VBR{server:03d}"
+        parts.append(f"<p>{server_name} (Backup Server) - {rng.randint(1, 999)} instances</p>")
+        for table in range(tables_per_server):
+            parts.append("<table><tr><th>Name</th><th>Platform</th><th>Instances</th></tr>")
+            for _ in range(vms_per_server // tables_per_server):
+                vm_number += 1
+                vm_name = f"VM-{vm_number:06d}" + (".hypertec-group.com" if vm_number % 3 == 0 else "")
+                parts.append(f"<tr><td>{vm_name}</td><td>{rng.choice(['VMware', 'Hyper-V', 'Agent'])}</td><td>1</td></tr>")
+                expected[vm_name.lower().replace(".hypertec-group.com", "")] = server_name
+            parts.append("</table>")
+    parts.append("</body></html>")
+    return "".join(parts), expected
@@ -0,0 +1,212 @@
+from collections import deque
+from config import get_env_variable
+from metrics import timed_phase
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+DNS_TIMEOUT = float(get_env_variable("DNS_TIMEOUT", 5))
+DNS_WORKERS = int(get_env_variable("DNS_WORKERS", 16))
+DNS_POSITIVE_TTL = float(get_env_variable("DNS_POSITIVE_TTL", 24 * 3600))
+DNS_NEGATIVE_TTL = float(get_env_variable("DNS_NEGATIVE_TTL", 3600))
+DNS_TIMEOUT_TTL = float(get_env_variable("DNS_TIMEOUT_TTL", 300))
+DNS_MAX_ATTEMPTS = 3
+DNS_RETRY_WAIT_TIME = 0.5
+
+class DnsResolver:
+    """
+    Resolves hostnames to IPv4 addresses with a positive and a negative TTL cache.
+
+    Up to DNS_WORKERS lookups run at once, each on a thread of its own, and each lookup gives up
+    DNS_TIMEOUT seconds after it started. Answers are cached for DNS_POSITIVE_TTL seconds and
+    unresolvable names for DNS_NEGATIVE_TTL seconds; both caches can be persisted between runs.
+    A name whose lookup timed out resolves to None for DNS_TIMEOUT_TTL seconds, unless the lookup
+    still finishes in the background; these entries are never persisted.
+
+    Args:
+        cache_path (str): JSON file the caches are loaded from and saved to; None keeps them in memory.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.cache = {}
+        self.lock = threading.Lock()
+        if cache_path:
+            self.load()
+
+    def load(self):
+        """
+        Loads the unexpired entries of the persisted caches.
+        """
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path) as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read DNS cache from {self.cache_path}: {e}")
+            return
+        now = time.time()
+        with self.lock:
+            self.cache = {host: entry for host, entry in entries.items() if entry["expires"] > now}
+
+    def save(self):
+        """
+        Persists the unexpired entries of both caches.
+        """
+        if not self.cache_path:
+            return
+        now = time.time()
+        with self.lock:
+            entries = {
+                host: entry for host, entry in self.cache.items()
+                if entry["expires"] > now and not entry.get("timed_out")
+            }
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w") as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temp_path, self.cache_path)
+
+    def get_cached(self, host_name):
+        """
+        Returns the cache entry for a hostname, or None if it is missing or expired.
+        """
+        with self.lock:
+            entry = self.cache.get(host_name)
+        if entry is None or entry["expires"] <= time.time():
+            return None
+        return entry
+
+    def store(self, host_name, ip_address):
+        ttl = DNS_POSITIVE_TTL if ip_address else DNS_NEGATIVE_TTL
+        with self.lock:
+            self.cache[host_name] = {"ip": ip_address, "expires": time.time() + ttl}
+
+    def store_timeout(self, host_name):
+        """
+        Caches a timed-out lookup briefly, so the name is not looked up and waited on again in the
+        same sweep. An answer that arrived in the meantime is kept.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.cache.get(host_name)
+            if entry is None or entry["expires"] <= now:
+                self.cache[host_name] = {"ip": None, "expires": now + DNS_TIMEOUT_TTL, "timed_out": True}
+
+    def query(self, host_name):
+        """
+        Resolves a hostname, retrying only temporary failures, and caches the answer.
+        """
+        for attempt in range(DNS_MAX_ATTEMPTS):
+            try:
+                ip_address = socket.gethostbyname(host_name)
+                self.store(host_name, ip_address)
+                return ip_address
+            except socket.gaierror as e:
+                # Only a temporary failure can succeed on retry; an unknown name will stay unknown
+                if e.errno == socket.EAI_AGAIN and attempt < DNS_MAX_ATTEMPTS - 1:
+                    logging.info(f"Attempt {attempt + 1} failed for {host_name}, retrying in {DNS_RETRY_WAIT_TIME} seconds...")
+                    time.sleep(DNS_RETRY_WAIT_TIME)
+                    continue
+                logging.error(f"Failed to retrieve IP address for {host_name}: {e}")
+                self.store(host_name, None)
+                return None
+
+    def start_lookup(self, host_name, finished):
+        """
+        Resolves a hostname on a new daemon thread, which puts (host_name, ip_address) on finished.
+        """
+        def lookup():
+            ip_address = None
+            try:
+                ip_address = self.query(host_name)
+            except Exception as e:
+                logging.error(f"Failed to retrieve IP address for {host_name}: {e}")
+            finally:
+                finished.put((host_name, ip_address))
+
+        threading.Thread(target=lookup, name=f"dns-{host_name}", daemon=True).start()
+
+    @timed_phase("dns")
+    def resolve(self, host_name):
+        """
+        Resolves a single hostname.
+
+        Returns:
+            str or None: The IP address, or None if the name cannot be resolved in time.
+        """
+        return self.resolve_many([host_name]).get(host_name)
+
+    @timed_phase("dns")
+    def resolve_many(self, host_names):
+        """
+        Resolves several hostnames concurrently.
+
+        Args:
+            host_names (list): The hostnames to resolve.
+
+        Returns:
+            dict: The IP address of every hostname, or None for the ones that cannot be resolved.
+        """
+        results = {}
+        pending = []
+        for host_name in dict.fromkeys(host_names):
+            entry = self.get_cached(host_name)
+            if entry is not None:
+                results[host_name] = entry["ip"]
+            else:
+                pending.append(host_name)
+
+        # gethostbyname cannot be cancelled, so a lookup that times out keeps running in the
+        # background; it gives up its slot though, so later lookups never queue behind it, and
+        # every lookup's timeout counts from when it actually started
+        pending = deque(pending)
+        finished = queue.SimpleQueue()
+        deadlines = {}
+        while pending or deadlines:
+            while pending and len(deadlines) < DNS_WORKERS:
+                host_name = pending.popleft()
+                deadlines[host_name] = time.monotonic() + DNS_TIMEOUT
+                self.start_lookup(host_name, finished)
+            try:
+                host_name, ip_address = finished.get(timeout=max(0, min(deadlines.values()) - time.monotonic()))
+                if deadlines.pop(host_name, None) is not None:
+                    results[host_name] = ip_address
+            except queue.Empty:
+                now = time.monotonic()
+                for host_name in [host_name for host_name, deadline in deadlines.items() if deadline <= now]:
+                    logging.error(f"Timed out after {DNS_TIMEOUT} seconds resolving {host_name}")
+                    del deadlines[host_name]
+                    self.store_timeout(host_name)
+                    results[host_name] = None
+        return results
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+def configure_resolver(cache_path=None):
+    """
+    Replaces the shared resolver with one that persists its caches to cache_path.
+
+    Returns:
+        DnsResolver: The new shared resolver.
+    """
+    global _resolver
+    with _resolver_lock:
+        _resolver = DnsResolver(cache_path)
+    return _resolver
+
+def get_resolver():
+    """
+    Returns the shared resolver, creating an in-memory one on first use.
+    """
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = DnsResolver()
+    return _resolver
@@ -1,8 +1,24 @@
+from config import get_env_variable
+import gzip
+import io
+import logging
+import os
+import shutil
 import smtplib
+import threading
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from email.mime.application import MIMEApplication
+
+SMTP_HOST = get_env_variable("SMTP_HOST", "mail1.hypertec-group.com")
+SMTP_PORT = int(get_env_variable("SMTP_PORT", 25))
+SMTP_TIMEOUT = float(get_env_variable("SMTP_TIMEOUT", 60))
+# Only the last LOG_ATTACHMENT_MAX_BYTES of the log are attached, before compression
+LOG_ATTACHMENT_MAX_BYTES = int(get_env_variable("LOG_ATTACHMENT_MAX_BYTES", 20 * 1024 * 1024))
+LOG_ATTACHMENT_CHUNK_SIZE = 1024 * 1024
+
+_smtp_connection = None
+_smtp_lock = threading.Lock()
 
 def compose_email(subject, body):
     subject = f"Jira Assets - Set Backup Locations Automation {subject}"
@@ -13,9 +29,73 @@ def compose_email(subject, body):
     )
     return (subject, body)
 
+def compress_log_tail(log_file_path, max_bytes=LOG_ATTACHMENT_MAX_BYTES):
+    """
+    Gzip-compresses a log file, or only its last max_bytes when it is larger, reading it in chunks
+    so only the compressed log is held in memory.
+
+    A truncated log starts at the first full line within the tail, after a note saying how much was left out.
+
+    Args:
+        log_file_path (str): The log file.
+        max_bytes (int): The most bytes of the log to compress.
+
+    Returns:
+        bytes: The compressed log.
+    """
+    compressed = io.BytesIO()
+    size = os.path.getsize(log_file_path)
+    with open(log_file_path, "rb") as log_file, gzip.GzipFile(fileobj=compressed, mode="wb") as gzip_file:
+        if size > max_bytes:
+            log_file.seek(size - max_bytes)
+            log_file.readline()
+            skipped = log_file.tell()
+            gzip_file.write(f"[log truncated, first {skipped} of {size} bytes left out]\n".encode())
+        shutil.copyfileobj(log_file, gzip_file, LOG_ATTACHMENT_CHUNK_SIZE)
+    return compressed.getvalue()
+
+def get_smtp_connection():
+    """
+    Returns the shared connection to the mail relay, connecting again if it was closed or dropped.
+    Must be called with _smtp_lock held.
+    """
+    global _smtp_connection
+    if _smtp_connection is not None:
+        try:
+            if _smtp_connection.noop()[0] == 250:
+                return _smtp_connection
+        except (smtplib.SMTPException, OSError):
+            pass
+        close_smtp_connection_unlocked()
+    _smtp_connection = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    return _smtp_connection
+
+def close_smtp_connection_unlocked():
+    global _smtp_connection
+    if _smtp_connection is None:
+        return
+    try:
+        _smtp_connection.quit()
+    except (smtplib.SMTPException, OSError):
+        _smtp_connection.close()
+    _smtp_connection = None
+
+def close_smtp_connection():
+    """
+    Closes the shared connection to the mail relay, e.g. once every report of the run is sent.
+    """
+    with _smtp_lock:
+        close_smtp_connection_unlocked()
+
 def send_email(sender_email, subject, body, user, log_file_path=None):
+    """
+    Sends an HTML email over the shared connection to the mail relay, optionally with the log
+    attached gzip-compressed; see compress_log_tail for how large logs are cut.
+
+    Returns:
+        True if the email was sent, otherwise the exception that stopped it.
+    """
     try:
-        server = smtplib.SMTP("mail1.hypertec-group.com")
         mail = MIMEMultipart()
         mail["Subject"] = subject
         mail["From"] = sender_email
@@ -24,26 +104,23 @@ def send_email(sender_email, subject, body, user, log_file_path=None):
         mail.attach(message_string)
         # If a log file path is provided, attach it to the email
         if log_file_path:
-            with open(log_file_path, "rb") as attachment:
-                # Create a MIMEBase object
-                part = MIMEBase("application", "octet-stream")
-                part.set_payload(attachment.read())
-
-                # Encode the payload in base64
-                encoders.encode_base64(part)
+            part = MIMEApplication(compress_log_tail(log_file_path), "gzip")
+            part.add_header(
+                "Content-Disposition",
+                "attachment",
+                filename=f"{os.path.basename(log_file_path)}.gz",
+            )
+            mail.attach(part)
 
-                # Add appropriate headers for the attachment
-                part.add_header(
-                    "Content-Disposition",
-                    f"attachment; filename= {log_file_path.split('/')[-1]}",
-                )
-
-                mail.attach(part)
-
-        server.sendmail(sender_email, user, mail.as_string())
-        server.quit()
+        message = mail.as_bytes()
+        with _smtp_lock:
+            try:
+                get_smtp_connection().sendmail(sender_email, user, message)
+            except smtplib.SMTPServerDisconnected:
+                # The relay dropped the idle connection between the check and the send
+                logging.warning("Mail relay closed the connection, reconnecting")
+                close_smtp_connection_unlocked()
+                get_smtp_connection().sendmail(sender_email, user, message)
         return True
     except Exception as e:
         return e
-
-
@@ -0,0 +1,163 @@
+from config import get_env_variable
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import sqlite3
+import threading
+
+INVENTORY_CACHE_MAX_AGE_HOURS = float(get_env_variable("INVENTORY_CACHE_MAX_AGE_HOURS", 24))
+INVENTORY_CACHE_EVICT_DAYS = float(get_env_variable("INVENTORY_CACHE_EVICT_DAYS", 30))
+
+class InventoryCache:
+    """
+    On-disk cache of Jira Assets object attributes, keyed by object ID.
+
+    Each entry keeps the object's attributes together with the "updated" timestamp Jira reported
+    for them. The cache is stored in SQLite in WAL mode; every thread gets its own connection, so
+    readers never block each other, and writes are serialized by a lock.
+
+    Args:
+        path (str): Path to the SQLite database file; it is created if missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        with self.write_lock:
+            connection = self.connection()
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS objects (
+                    object_id TEXT PRIMARY KEY,
+                    object_type TEXT,
+                    updated TEXT,
+                    attributes TEXT NOT NULL,
+                    cached_at TEXT NOT NULL,
+                    seen_at TEXT NOT NULL
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS objects_type_seen ON objects (object_type, seen_at)")
+            connection.commit()
+
+    def connection(self):
+        """
+        Returns the calling thread's connection to the cache.
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self.local.connection = connection
+        return connection
+
+    def get(self, object_id, updated=None):
+        """
+        Returns the cached attributes of an object if they are still valid.
+
+        With an "updated" timestamp from Jira, the entry is valid only if it was cached for that
+        same timestamp. Without one, the entry is valid for INVENTORY_CACHE_MAX_AGE_HOURS.
+
+        Args:
+            object_id (str): The ID of the object.
+            updated (str): The object's current "updated" timestamp in Jira, if known.
+
+        Returns:
+            list or None: The attributes as returned by Jira, or None on a miss.
+        """
+        row = self.connection().execute(
+            "SELECT updated, attributes, cached_at FROM objects WHERE object_id = ?", (str(object_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        cached_updated, attributes, cached_at = row
+        if updated is not None:
+            if cached_updated != updated:
+                return None
+        elif datetime.now(timezone.utc) - datetime.fromisoformat(cached_at) > timedelta(hours=INVENTORY_CACHE_MAX_AGE_HOURS):
+            return None
+        return json.loads(attributes)
+
+    def put_many(self, entries):
+        """
+        Stores or replaces several objects in one transaction.
+
+        Args:
+            entries (list): Tuples of (object_id, object_type, updated, attributes).
+        """
+        now = datetime.now(timezone.utc).isoformat(timespec="microseconds")
+        rows = [
+            (str(object_id), object_type, updated, json.dumps(attributes), now, now)
+            for object_id, object_type, updated, attributes in entries
+        ]
+        with self.write_lock:
+            connection = self.connection()
+            connection.executemany(
+                """
+                INSERT INTO objects (object_id, object_type, updated, attributes, cached_at, seen_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (object_id) DO UPDATE SET
+                    object_type = COALESCE(excluded.object_type, objects.object_type),
+                    updated = excluded.updated,
+                    attributes = excluded.attributes,
+                    cached_at = excluded.cached_at,
+                    seen_at = excluded.seen_at
+                """,
+                rows,
+            )
+            connection.commit()
+
+    def put(self, object_id, object_type, updated, attributes):
+        """
+        Stores or replaces a single object.
+        """
+        self.put_many([(object_id, object_type, updated, attributes)])
+
+    def invalidate(self, object_id):
+        """
+        Removes an object, e.g. after it was changed in Jira.
+        """
+        with self.write_lock:
+            connection = self.connection()
+            connection.execute("DELETE FROM objects WHERE object_id = ?", (str(object_id),))
+            connection.commit()
+
+    def evict_unseen(self, object_type, since):
+        """
+        Removes the objects of a type that were not seen since the given time.
+
+        Called after a full sweep of the type, this drops the objects that were deleted in Jira.
+
+        Args:
+            object_type (str): The object type that was swept.
+            since (datetime): When the sweep started, as an aware UTC datetime.
+
+        Returns:
+            int: The number of objects removed.
+        """
+        with self.write_lock:
+            connection = self.connection()
+            cursor = connection.execute(
+                "DELETE FROM objects WHERE object_type = ? AND seen_at < ?", (object_type, since.isoformat(timespec="microseconds"))
+            )
+            connection.commit()
+        if cursor.rowcount:
+            logging.info(f"Evicted {cursor.rowcount} deleted {object_type} objects from the inventory cache")
+        return cursor.rowcount
+
+    def evict_stale(self, max_age_days=INVENTORY_CACHE_EVICT_DAYS):
+        """
+        Removes every object that was not seen for max_age_days, whatever its type.
+
+        Returns:
+            int: The number of objects removed.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        with self.write_lock:
+            connection = self.connection()
+            cursor = connection.execute("DELETE FROM objects WHERE seen_at < ?", (cutoff.isoformat(timespec="microseconds"),))
+            connection.commit()
+        if cursor.rowcount:
+            logging.info(f"Evicted {cursor.rowcount} stale objects from the inventory cache")
+        return cursor.rowcount
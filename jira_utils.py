@@ -1,8 +1,16 @@
 from config import get_env_variable
-from api_handler import make_jira_request
+from api_handler import make_jira_request, make_jira_request_async
+from inventory_cache import InventoryCache
+from logger import object_logger
+from dns_resolver import get_resolver
+from metrics import get_metrics, timed_phase
+from site_index import get_site_index
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import asyncio
 import logging
-import time
-import socket
+import threading
 
 env_variable_names = [
     "JIRA_HOST_ATTRIBUTE_ID", "JIRA_GUESTVM_ATTRIBUTE_ID",
@@ -44,9 +52,265 @@ ATTRIBUTE_DISPLAY_DICT = {
     "device": [DEVICE_NAME_ATTRIBUTE_ID, DEVICE_NETWORK_ATTRIBUTE_ID, DEVICE_SITE_ATTRIBUTE_ID],
 }
 
+# Every attribute read while deciding site and device type, loaded in bulk with each navlist page
+INVENTORY_ATTRIBUTE_DICT = {
+    "host": [
+        HOST_NAME_ATTRIBUTE_ID, HOST_NETWORK_ATTRIBUTE_ID, HOST_SITE_ATTRIBUTE_ID,
+        HOST_OS_ATTRIBUTE_ID, HOST_MODEL_ATTRIBUTE_ID, HOST_DEVICE_TYPE_ATTRIBUTE_ID,
+    ],
+    "virtual guest": [
+        GUESTVM_NAME_ATTRIBUTE_ID, GUESTVM_NETWORK_ATTRIBUTE_ID, GUESTVM_SITE_ATTRIBUTE_ID,
+        GUESTVM_OS_ATTRIBUTE_ID, GUESTVM_DEVICE_TYPE_ATTRIBUTE_ID,
+    ],
+    "device": [
+        DEVICE_NAME_ATTRIBUTE_ID, DEVICE_NETWORK_ATTRIBUTE_ID, DEVICE_SITE_ATTRIBUTE_ID,
+        DEVICE_MODEL_ATTRIBUTE_ID, DEVICE_DEVICE_TYPE_ATTRIBUTE_ID,
+    ],
+}
+
 SERVER_OS = ["CentOS", "Ubuntu", "Server", "Linux"]
 COMPUTER_OS = ["Windows 10", "Windows 8.1", "Windows 7"]
 AUTH = get_env_variable("JIRA_EMAIL"), get_env_variable("JIRA_TOKEN")
+PAGE_SIZE = int(get_env_variable("JIRA_PAGE_SIZE", 25))
+PAGE_FETCH_WORKERS = int(get_env_variable("JIRA_PAGE_FETCH_WORKERS", 4))
+# Time zone of the Jira account, e.g. Europe/Berlin; AQL reads dates in the account's time zone
+JIRA_TIMEZONE = get_env_variable("JIRA_TIMEZONE")
+
+# Attribute snapshots for the current run, keyed by object ID and then by objectTypeAttributeId
+_attribute_snapshots = {}
+
+# On-disk cache of object attributes shared between runs, enabled with configure_inventory_cache
+_inventory_cache = None
+
+NETWORK_OBJECT_TYPE_ID = "36"
+
+# IP network object IDs by IPv4 address, loaded once per run by load_network_object_index
+_network_objects = None
+# Set when the index could not be loaded completely, so no network objects are created this run
+_network_objects_failed = False
+_network_objects_lock = threading.Lock()
+_network_create_locks = {}
+_network_create_async_locks = {}
+
+class SweepStatus:
+    """
+    Counts the navlist pages and objects that failed during a sweep, so the run can tell whether
+    it saw and processed every object. Safe to update from several threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.failed_pages = 0
+        self.failed_objects = 0
+
+    def page_failed(self):
+        with self.lock:
+            self.failed_pages += 1
+
+    def object_failed(self):
+        with self.lock:
+            self.failed_objects += 1
+
+    @property
+    def complete(self):
+        """
+        True if every page loaded and every object was processed without an error.
+        """
+        return self.failed_pages == 0 and self.failed_objects == 0
+
+def index_attributes(attributes):
+    """
+    Indexes a list of Jira object attributes by their objectTypeAttributeId.
+    """
+    return {str(item["objectTypeAttributeId"]): item for item in attributes}
+
+def configure_inventory_cache(path):
+    """
+    Enables the on-disk inventory cache at the given path, or disables it if path is None.
+
+    Returns:
+        InventoryCache or None: The cache now in use.
+    """
+    global _inventory_cache
+    _inventory_cache = InventoryCache(path) if path else None
+    return _inventory_cache
+
+def get_cached_attributes(object_id, updated=None):
+    """
+    Returns the snapshot of an object built from the inventory cache, or None on a miss.
+    """
+    if _inventory_cache is None:
+        return None
+    attributes = _inventory_cache.get(object_id, updated)
+    if attributes is None:
+        return None
+    snapshot = index_attributes(attributes)
+    _attribute_snapshots[str(object_id)] = snapshot
+    return snapshot
+
+def store_fetched_attributes(object_id, attributes, updated=None):
+    """
+    Stores attributes fetched from Jira as the object's snapshot and in the inventory cache.
+    """
+    snapshot = index_attributes(attributes)
+    _attribute_snapshots[str(object_id)] = snapshot
+    if _inventory_cache is not None:
+        _inventory_cache.put(object_id, None, updated, attributes)
+    return snapshot
+
+def jira_get_object_attributes(object_id, refresh=False, updated=None):
+    """
+    Retrieves the attributes of an object in Jira, fetching them at most once per run.
+
+    The run's snapshot is checked first, then the on-disk inventory cache, and only then Jira.
+
+    Args:
+        object_id (str): The ID of the object.
+        refresh (bool): Fetch the attributes again even if a snapshot or cache entry exists.
+        updated (str): The object's "updated" timestamp in Jira, used to revalidate the cache entry.
+
+    Returns:
+        dict or None: The attributes indexed by objectTypeAttributeId, or None if the request failed.
+    """
+    object_id = str(object_id)
+    if not refresh:
+        if object_id in _attribute_snapshots:
+            return _attribute_snapshots[object_id]
+        snapshot = get_cached_attributes(object_id, updated)
+        if snapshot is not None:
+            return snapshot
+
+    with get_metrics().time_phase("read attributes"):
+        response = make_jira_request("GET", f"/object/{object_id}/attributes")
+    if response is None:
+        return None
+
+    return store_fetched_attributes(object_id, response, updated)
+
+def get_attribute_values(object_id, attribute_id):
+    """
+    Returns the values of a single attribute of an object from its snapshot.
+
+    Args:
+        object_id (str): The ID of the object.
+        attribute_id (str): The objectTypeAttributeId to look up.
+
+    Returns:
+        list: The objectAttributeValues of the attribute, or an empty list if it is not set.
+    """
+    snapshot = jira_get_object_attributes(object_id)
+    if not snapshot:
+        return []
+    item = snapshot.get(str(attribute_id))
+    if item is None:
+        return []
+    return item["objectAttributeValues"] or []
+
+def seed_attribute_snapshot(object_id, attributes):
+    """
+    Stores attributes that were already returned by a bulk request as the object's snapshot.
+    """
+    _attribute_snapshots[str(object_id)] = index_attributes(attributes)
+
+def patch_attribute_snapshot(object_id, attribute_id, values):
+    """
+    Replaces the values of an attribute in an existing snapshot after a successful write.
+    """
+    snapshot = _attribute_snapshots.get(str(object_id))
+    if snapshot is not None:
+        snapshot[str(attribute_id)] = {"objectTypeAttributeId": str(attribute_id), "objectAttributeValues": values}
+    # The object's "updated" timestamp changed with the write, so the cached copy is stale
+    if _inventory_cache is not None:
+        _inventory_cache.invalidate(object_id)
+
+def build_attribute_payload(attribute_id, values):
+    """
+    Builds the PUT /object/{id} payload that sets a single attribute.
+    """
+    return {
+        "attributes": [
+            {
+                "objectTypeAttributeId": attribute_id,
+                "objectAttributeValues": values,
+            }
+        ]
+    }
+
+def clear_attribute_snapshots(object_id=None):
+    """
+    Drops the snapshot of a single object, or of every object if no ID is given.
+    """
+    if object_id is None:
+        _attribute_snapshots.clear()
+    else:
+        _attribute_snapshots.pop(str(object_id), None)
+
+class ObjectWriteBuffer:
+    """
+    Collects the attribute changes made to one object so they are sent as a single PUT /object/{id}.
+
+    Args:
+        object_id (str): The ID of the object the changes belong to.
+    """
+
+    def __init__(self, object_id):
+        self.object_id = str(object_id)
+        self.changes = {}
+
+    def add(self, attribute_id, values, snapshot_values, description):
+        """
+        Queues a change, replacing any earlier change to the same attribute.
+
+        Args:
+            attribute_id (str): The objectTypeAttributeId to set.
+            values (list): The objectAttributeValues to send to Jira.
+            snapshot_values (list): The values to patch into the attribute snapshot once the write succeeds.
+            description (str): What the change is, used in the log messages.
+        """
+        self.changes[str(attribute_id)] = (values, snapshot_values, description)
+
+    def build_payload(self):
+        return {
+            "attributes": [
+                {"objectTypeAttributeId": attribute_id, "objectAttributeValues": values}
+                for attribute_id, (values, _, _) in self.changes.items()
+            ]
+        }
+
+    def finish(self, response):
+        """
+        Logs the outcome of a flush and patches the snapshot if it succeeded.
+        """
+        descriptions = ", ".join(description for _, _, description in self.changes.values())
+        if response:
+            for attribute_id, (_, snapshot_values, description) in self.changes.items():
+                object_logger.info("Updated %s for %s", description, self.object_id)
+                patch_attribute_snapshot(self.object_id, attribute_id, snapshot_values)
+        else:
+            logging.error(f"Failed to update {descriptions} for {self.object_id}")
+        self.changes = {}
+        return bool(response)
+
+    def flush(self):
+        """
+        Sends every queued change in one request.
+
+        Returns:
+            bool: True if the update succeeded or there was nothing to send, False otherwise.
+        """
+        if not self.changes:
+            return True
+        response = make_jira_request("PUT", f"/object/{self.object_id}", data=self.build_payload())
+        return self.finish(response)
+
+    async def flush_async(self):
+        """
+        Async version of flush.
+        """
+        if not self.changes:
+            return True
+        response = await make_jira_request_async("PUT", f"/object/{self.object_id}", data=self.build_payload())
+        return self.finish(response)
 
 def get_attribute_id(type):
     """
@@ -57,6 +321,16 @@ def get_attribute_id(type):
         "virtual guest": JIRA_GUESTVM_ATTRIBUTE_ID,
     }.get(type)
 
+def get_status_attribute_id(type):
+    """
+    Returns the install status attribute ID based on the type, or the backup location attribute ID
+    the status used to be read from when no status attribute is configured.
+    """
+    return {
+        "host": JIRA_HOST_STATUS_ATTRIBUTE_ID,
+        "virtual guest": JIRA_GUESTVM_STATUS_ATTRIBUTE_ID,
+    }.get(type) or get_attribute_id(type)
+
 def check_attribute(item, attribute_id, backup_location):
     """
     Checks if the given item has the specified attribute set to the backup location.
@@ -73,12 +347,12 @@ def object_attribute_search(object_key, backup_location, type):
         logging.error(f"Unknown type: {type}")
         return False
 
-    response = make_jira_request("GET", f"/object/{object_key}/attributes")
-    if response:
-        for item in response:
-            if check_attribute(item, attribute_id, backup_location):
-                logging.info(f"Found {backup_location} already set for {object_key}, skipping.")
-                return True
+    snapshot = jira_get_object_attributes(object_key)
+    if snapshot:
+        item = snapshot.get(str(attribute_id))
+        if item and item["objectAttributeValues"] and check_attribute(item, attribute_id, backup_location):
+            object_logger.info("Found %s already set for %s, skipping.", backup_location, object_key)
+            return True
     return False
 
 def is_valid_install_status(value, do_not_set_status):
@@ -87,24 +361,26 @@ def is_valid_install_status(value, do_not_set_status):
     """
     return value["displayValue"].lower() not in do_not_set_status
 
+def has_valid_install_status(values):
+    """
+    Checks if any of the install status values allows setting the backup location.
+    """
+    for value in values:
+        object_logger.info("Install value %s", value['displayValue'])
+        if is_valid_install_status(value, ["disposed", "retired", "lost-stolen"]):
+            return True
+    return False
+
 def install_status_check(object_key, type):
     """
     Checks the installation status of an object.
     """
-    attribute_id = get_attribute_id(type)
+    attribute_id = get_status_attribute_id(type)
     if not attribute_id:
         logging.error(f"Unknown type: {type}")
         return False
 
-    response = make_jira_request("GET", f"/object/{object_key}/attributes")
-    if response:
-        for item in response:
-            if item["objectTypeAttributeId"] == attribute_id:
-                for value in item["objectAttributeValues"]:
-                    logging.info(f"Install value {value['displayValue']}")
-                    if is_valid_install_status(value, ["disposed", "retired", "lost-stolen"]):
-                        return True
-    return False
+    return has_valid_install_status(get_attribute_values(object_key, attribute_id))
 
 def object_type_search(hostname):
     # Helper function to search for an object type
@@ -129,6 +405,7 @@ def object_type_search(hostname):
 
 
 
+@timed_phase("write")
 def update_backup_location(object_key, backup_location, type):
     # Determine the attribute ID based on the type
     attribute_id = get_attribute_id(type)
@@ -157,52 +434,293 @@ def update_backup_location(object_key, backup_location, type):
     response_data = make_jira_request("PUT", f"/object/{object_key}", data=payload)
 
     if response_data is not None:
-        logging.info(f"Updated location for {object_key} to {backup_location}")
+        object_logger.info("Updated location for %s to %s", object_key, backup_location)
+        patch_attribute_snapshot(object_key, attribute_id, payload["attributes"][0]["objectAttributeValues"])
     else:
         logging.error(f"Failed to update location for {object_key}")
 
-def jira_get_objects(object_type: str):
+def normalize_host_name(host_name):
+    """
+    Normalizes a host name the way veeam.py normalizes the VM names in the backup report.
+    """
+    return host_name.lower().replace(".hypertec-group.com", "")
+
+class HostnameIndex:
+    """
+    Host and Virtual Guest objects indexed by normalized name, with the attributes the Veeam backup
+    reconciliation needs, so every VM in the report is matched without a request of its own.
+
+    Hosts are added before Virtual Guests, and the first object added under a name wins, which
+    keeps the order object_type_search used to search in.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.sorted_names = None
+
+    def add(self, object_type, object_entry):
+        snapshot = index_attributes(object_entry.get("attributes", []))
+        backup_location = snapshot.get(str(get_attribute_id(object_type)), {}).get("objectAttributeValues") or []
+        install_status = snapshot.get(str(get_status_attribute_id(object_type)), {}).get("objectAttributeValues") or []
+        self.entries.setdefault(normalize_host_name(object_entry["label"]), {
+            "label": object_entry["label"],
+            "object_key": object_entry["id"],
+            "object_type": object_type,
+            "backup_location": backup_location[0].get("displayValue") if backup_location else None,
+            "install_status": install_status,
+        })
+        self.sorted_names = None
+
+    def find(self, host_name):
+        """
+        Returns the entry of the object named host_name.
+
+        Exact matches are preferred. Otherwise the first name containing host_name is returned, as the
+        LIKE query of object_type_search did.
+
+        Returns:
+            dict or None: The entry, or None if no object matches.
+        """
+        host_name = normalize_host_name(host_name)
+        entry = self.entries.get(host_name)
+        if entry is not None:
+            return entry
+        if self.sorted_names is None:
+            self.sorted_names = sorted(self.entries, key=lambda name: (self.entries[name]["object_type"] != "host", name))
+        for name in self.sorted_names:
+            if host_name in name:
+                return self.entries[name]
+        return None
+
+def jira_load_hostname_index():
+    """
+    Loads every Host and Virtual Guest with its name, install status and backup location.
+
+    Returns:
+        HostnameIndex or None: The index, or None if any page could not be loaded, since a VM on a
+        missing page would otherwise be reported as not existing.
+    """
+    hostname_index = HostnameIndex()
+    status = SweepStatus()
+    for object_type, ql_object_type, name_attribute_id in (
+        ("host", "Host", HOST_NAME_ATTRIBUTE_ID),
+        ("virtual guest", "Virtual Guest", GUESTVM_NAME_ATTRIBUTE_ID),
+    ):
+        object_entries = jira_load_navlist_entries(
+            lambda page: build_attribute_navlist_payload(
+                OBJECT_TYPE_ID_DICT[object_type], f'objectType = "{ql_object_type}"',
+                [name_attribute_id, get_attribute_id(object_type), get_status_attribute_id(object_type)], page,
+            ),
+            f"{object_type} names",
+            status,
+        )
+        if not status.complete:
+            logging.error(f"Failed to load {status.failed_pages} pages of the {object_type} names")
+            return None
+        for object_entry in object_entries:
+            hostname_index.add(object_type, object_entry)
+    logging.info(f"Loaded {len(hostname_index.entries)} host names")
+    return hostname_index
+
+def get_jira_timezone():
+    """
+    Returns the time zone AQL dates are written in.
+
+    Raises:
+        ValueError: If JIRA_TIMEZONE is not set or is not a known time zone.
+    """
+    if not JIRA_TIMEZONE:
+        raise ValueError("JIRA_TIMEZONE must be set to the time zone of the Jira account to filter on updated")
+    try:
+        return ZoneInfo(JIRA_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"JIRA_TIMEZONE {JIRA_TIMEZONE!r} is not a known time zone") from e
+
+def build_navlist_payload(object_type: str, page: int, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None):
+    """
+    Builds the /object/navlist/aql payload for one page of objects of the given type.
+
+    Args:
+        object_type (str): The type of object to retrieve (host, virtual guest, or device).
+        page (int): The page number, starting at 1.
+        include_attributes (bool): Request the attributes in INVENTORY_ATTRIBUTE_DICT with the page.
+        page_size (int): The number of objects per page.
+        updated_since (datetime): Only include objects updated after this time.
+
+    Returns:
+        dict: The request payload.
+    """
+    if include_attributes:
+        attributes_to_display_ids = [attribute_id for attribute_id in INVENTORY_ATTRIBUTE_DICT[object_type] if attribute_id]
+    else:
+        attributes_to_display_ids = ATTRIBUTE_DISPLAY_DICT[object_type]
+    ql_query = f'objectType = "{"Virtual Guest" if object_type == "virtual guest" else object_type}"'
+    if updated_since is not None:
+        # AQL reads the date in the Jira account's time zone, not the one of this machine
+        ql_query += f' AND updated > "{updated_since.astimezone(get_jira_timezone()).strftime("%Y-%m-%d %H:%M")}"'
+    return {
+        "objectTypeId": OBJECT_TYPE_ID_DICT[object_type],
+        "attributesToDisplay": {
+            "attributesToDisplayIds": attributes_to_display_ids
+        },
+        "page": page,
+        "asc": 1,
+        "resultsPerPage": page_size,
+        "includeAttributes": include_attributes,
+        "objectSchemaId": OBJECT_SCHEMA,
+        "qlQuery": ql_query,
+    }
+
+def seed_navlist_snapshots(object_entries, object_type=None):
+    """
+    Seeds the attribute snapshots and the inventory cache from navlist entries that were loaded
+    with their attributes.
+    """
+    cache_entries = []
+    for object_entry in object_entries:
+        if "attributes" in object_entry:
+            seed_attribute_snapshot(object_entry["id"], object_entry["attributes"])
+            cache_entries.append((object_entry["id"], object_type, object_entry.get("updated"), object_entry["attributes"]))
+    if _inventory_cache is not None and cache_entries:
+        _inventory_cache.put_many(cache_entries)
+
+@timed_phase("enumerate")
+def jira_get_navlist_page(object_type: str, page: int, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None):
+    """
+    Retrieves one page of objects of the given type.
+
+    Args:
+        object_type (str): The type of object to retrieve (host, virtual guest, or device).
+        page (int): The page number, starting at 1.
+        include_attributes (bool): Also load the attributes in INVENTORY_ATTRIBUTE_DICT and seed the snapshots.
+        page_size (int): The number of objects per page.
+        updated_since (datetime): Only include objects updated after this time.
+
+    Returns:
+        dict or None: The navlist response, whose "pageSize" is the total number of pages, or None on failure.
+    """
+    payload = build_navlist_payload(object_type, page, include_attributes, page_size, updated_since)
+    data = make_jira_request("POST", "/object/navlist/aql", data=payload)
+    if data:
+        logging.info(f"Adding page {page} of {data['pageSize']}")
+        if include_attributes:
+            seed_navlist_snapshots(data["objectEntries"], object_type)
+    else:
+        logging.error(f"Failed to retrieve objects for {object_type} failure occurred at {page}, refer to previous errors for api call errors.")
+    return data
+
+def jira_iter_objects(object_type: str, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None, status=None):
+    """
+    Yields the objects of the given type page by page, as soon as each page arrives.
+
+    The first page tells how many pages there are; up to PAGE_FETCH_WORKERS of the following pages
+    are then fetched concurrently ahead of the consumer. Objects are yielded in page order, and only
+    the pages in that window are held in memory at once.
+
+    Args:
+        object_type (str): The type of object to retrieve (host, virtual guest, or device).
+        include_attributes (bool): Also load the attributes in INVENTORY_ATTRIBUTE_DICT with each page
+            and seed the attribute snapshots with them, so no per-object GET is needed afterwards.
+        page_size (int): The number of objects per page.
+        updated_since (datetime): Only yield objects updated after this time.
+        status (SweepStatus): Counts the pages that failed to load, which are skipped.
+
+    Yields:
+        dict: One navlist object entry.
+    """
+    first_page = jira_get_navlist_page(object_type, 1, include_attributes, page_size, updated_since)
+    if not first_page:
+        if status is not None:
+            status.page_failed()
+        return
+
+    pages = first_page["pageSize"]
+    next_page = 2
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+        def prefetch():
+            nonlocal next_page
+            while next_page <= pages and len(pending) < PAGE_FETCH_WORKERS:
+                pending.append(executor.submit(jira_get_navlist_page, object_type, next_page, include_attributes, page_size, updated_since))
+                next_page += 1
+
+        prefetch()
+        yield from first_page["objectEntries"]
+        while pending:
+            data = pending.popleft().result()
+            prefetch()
+            if data:
+                yield from data["objectEntries"]
+            elif status is not None:
+                status.page_failed()
+
+def jira_get_objects(object_type: str, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None):
     """
     Retrieves a list of objects from Jira based on the specified object type.
 
     Args:
         object_type (str): The type of object to retrieve (host, virtual guest, or device).
+        include_attributes (bool): Also load the attributes in INVENTORY_ATTRIBUTE_DICT with each page
+            and seed the attribute snapshots with them, so no per-object GET is needed afterwards.
+        page_size (int): The number of objects per page.
+        updated_since (datetime): Only include objects updated after this time.
 
     Returns:
         list: A list of dictionaries, where each dictionary represents an object.
     """
-    object_type_id = OBJECT_TYPE_ID_DICT[object_type]
-    attributes_to_display_ids = ATTRIBUTE_DISPLAY_DICT[object_type]
-    if object_type == "virtual guest":
-        object_type = "Virtual Guest"
-    pages = 1
-    page = 1
-    data_list = []
+    return list(jira_iter_objects(object_type, include_attributes, page_size, updated_since))
 
-    while pages >= page:
-        payload = {
-            "objectTypeId": object_type_id,
-            "attributesToDisplay": {
-                "attributesToDisplayIds": attributes_to_display_ids
-            },
-            "page": page,
-            "asc": 1,
-            "resultsPerPage": 25,
-            "includeAttributes": False,
-            "objectSchemaId": OBJECT_SCHEMA,
-            "qlQuery": f'objectType = "{object_type}"',
-        }
-        
-        data = make_jira_request("POST", "/object/navlist/aql", data=payload)
-        
-        if data:
-            pages = data["pageSize"]
-            logging.info(f"Adding page {page} of {pages}")
-            page += 1
-            data_list.extend(data["objectEntries"])
-        else:
-            logging.error(f"Failed to retrieve objects for {object_type} failure occurred at {page}, refer to previous errors for api call errors.")
-    return data_list
+def build_attribute_navlist_payload(object_type_id, ql_query, attribute_ids, page, page_size=PAGE_SIZE):
+    """
+    Builds the /object/navlist/aql payload for one page of objects loaded with the given attributes.
+    """
+    return {
+        "objectTypeId": object_type_id,
+        "attributesToDisplay": {
+            "attributesToDisplayIds": [attribute_id for attribute_id in attribute_ids if attribute_id]
+        },
+        "page": page,
+        "asc": 1,
+        "resultsPerPage": page_size,
+        "includeAttributes": True,
+        "objectSchemaId": OBJECT_SCHEMA,
+        "qlQuery": ql_query,
+    }
+
+@timed_phase("enumerate")
+def jira_load_navlist_entries(build_payload, description, status=None):
+    """
+    Loads every page of a navlist query, fetching the pages after the first concurrently.
+
+    Args:
+        build_payload (callable): Builds the navlist payload for a page number.
+        description (str): What is being loaded, for the log messages.
+        status (SweepStatus): Counts the pages that failed to load, which are skipped.
+
+    Returns:
+        list or None: The object entries of every page that loaded, or None if the first page failed.
+    """
+    first_page = make_jira_request("POST", "/object/navlist/aql", data=build_payload(1))
+    if not first_page:
+        logging.error(f"Failed to load the {description}, refer to previous errors for api call errors.")
+        if status is not None:
+            status.page_failed()
+        return None
+
+    object_entries = list(first_page["objectEntries"])
+    with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+        pages = executor.map(
+            lambda page: make_jira_request("POST", "/object/navlist/aql", data=build_payload(page)),
+            range(2, first_page["pageSize"] + 1),
+        )
+        for page, data in enumerate(pages, start=2):
+            if data:
+                object_entries.extend(data["objectEntries"])
+            else:
+                logging.error(f"Failed to load page {page} of the {description}")
+                if status is not None:
+                    status.page_failed()
+    return object_entries
 
 def check_if_device_type_needs_update(object_type: str, object_id: str, device_type: str):
     """
@@ -227,30 +745,28 @@ def check_if_device_type_needs_update(object_type: str, object_id: str, device_t
         logging.error(f"Unknown object type: {object_type}")
         return False
 
-    # Make the JIRA API request
-    response = make_jira_request("GET", f"/object/{object_id}/attributes")
-    if response is None:
+    # Read the attribute from the object's snapshot
+    snapshot = jira_get_object_attributes(object_id)
+    if snapshot is None:
         logging.error(f"Failed to retrieve attributes for object {object_id}")
         return False
 
-    for item in response:
-        if item["objectTypeAttributeId"] == attribute_id:
-            if item["objectAttributeValues"] is not None:
-                return any(value["displayValue"] == device_type for value in item["objectAttributeValues"])
+    item = snapshot.get(str(attribute_id))
+    if item is not None and item["objectAttributeValues"] is not None:
+        return any(value["displayValue"] == device_type for value in item["objectAttributeValues"])
 
     return False  # Return False if the device type is not found or no values present
 
-def jira_set_device_type(object_id: str, object_type: str, device_type: str):
+def get_device_type_update(object_type: str, device_type: str):
     """
-    Updates the device type of an object in Jira.
+    Resolves the attribute and the referenced object used to set a device type.
 
     Args:
-        object_id (str): The ID of the object to update.
         object_type (str): The type of object to update (host, virtual guest, or device).
-        device_type (str): The device type to update.
+        device_type (str): The device type to set.
 
     Returns:
-        bool: True if the update is successful, False otherwise.
+        tuple: The attribute ID and device type object ID, or (None, None) if either is unknown.
     """
     attribute_id = {
         "host": HOST_DEVICE_TYPE_ATTRIBUTE_ID,
@@ -265,20 +781,36 @@ def jira_set_device_type(object_id: str, object_type: str, device_type: str):
 
     if not attribute_id or not device_id:
         logging.error(f"Unknown object type or device type: {object_type}, {device_type}")
+        return None, None
+    return attribute_id, device_id
+
+def jira_set_device_type(object_id: str, object_type: str, device_type: str, write_buffer: ObjectWriteBuffer = None):
+    """
+    Updates the device type of an object in Jira.
+
+    Args:
+        object_id (str): The ID of the object to update.
+        object_type (str): The type of object to update (host, virtual guest, or device).
+        device_type (str): The device type to update.
+        write_buffer (ObjectWriteBuffer): Queue the change on this buffer instead of sending it now.
+
+    Returns:
+        bool: True if the update is successful (or was queued), False otherwise.
+    """
+    attribute_id, device_id = get_device_type_update(object_type, device_type)
+    if not attribute_id:
         return False
 
-    payload = {
-        "attributes": [
-            {
-                "objectTypeAttributeId": attribute_id,
-                "objectAttributeValues": [{"value": device_id}],
-            }
-        ]
-    }
+    if write_buffer is not None:
+        write_buffer.add(attribute_id, [{"value": device_id}], [{"value": device_id, "displayValue": device_type}], f"device type to {device_type}")
+        return True
+
+    payload = build_attribute_payload(attribute_id, [{"value": device_id}])
 
     response = make_jira_request("PUT", f"/object/{object_id}", data=payload)
     if response:
-        logging.info(f"Updated device type for {object_id}: {device_type}")
+        object_logger.info("Updated device type for %s: %s", object_id, device_type)
+        patch_attribute_snapshot(object_id, attribute_id, [{"value": device_id, "displayValue": device_type}])
         return True
     else:
         logging.error(f"Failed to update device type for {object_id}")
@@ -304,13 +836,9 @@ def jira_get_object_os(object_id: str, object_type: str):
         logging.error(f"Unknown object type: {object_type}")
         return None
 
-    response = make_jira_request("GET", f"/object/{object_id}/attributes")
-    if response:
-        for item in response:
-            if item["objectTypeAttributeId"] == attribute_id:
-                for value in item["objectAttributeValues"]:
-                    if "displayValue" in value:
-                        return value["displayValue"]
+    for value in get_attribute_values(object_id, attribute_id):
+        if "displayValue" in value:
+            return value["displayValue"]
 
     return None
 
@@ -362,13 +890,9 @@ def jira_get_object_model(object_id, object_type):
         logging.error(f"Unknown object type: {object_type}")
         return None
 
-    response = make_jira_request("GET", f"/object/{object_id}/attributes")
-    if response:
-        for item in response:
-            if item["objectTypeAttributeId"] == attribute_id:
-                for attribute_value in item["objectAttributeValues"]:
-                    if "displayValue" in attribute_value:
-                        return attribute_value["displayValue"]
+    for attribute_value in get_attribute_values(object_id, attribute_id):
+        if "displayValue" in attribute_value:
+            return attribute_value["displayValue"]
 
     return None
 
@@ -393,66 +917,32 @@ def jira_get_object_ip_details(object_id, type):
         logging.error(f"Unknown type: {type}")
         return []
 
-    response = make_jira_request("GET", f"/object/{object_id}/attributes")
-    ip_list = []
-    if response:
-        for item in response:
-            if item["objectTypeAttributeId"] == attribute_id:
-                ip_list.extend(value["displayValue"] for value in item["objectAttributeValues"] if "displayValue" in value)
-
-    return ip_list
+    return [value["displayValue"] for value in get_attribute_values(object_id, attribute_id) if "displayValue" in value]
 
 def decide_site_from_ip(ip_list):
     """
     Decides the site based on the provided list of IP addresses.
 
+    Each IP is matched against the networks in the site prefixes file, most specific network first.
+
     Args:
         ip_list (list): A list of IP addresses.
 
     Returns:
         tuple: A tuple containing the site name and corresponding IP address, or (None, None) if no match is found.
     """
-    site_map = {
-        "10": {
-            "64": "IND-A",
-            "1": "MTL-A", "2": "MTL-A", "3": "MTL-A", "4": "MTL-A", "51": "MTL-A",
-            "39": "TEM-A", "33": "TEM-A", "32": "TEM-A", "35": "TEM-A",
-            "16": "QUE-A", "18": "QUE-A", "31": "QUE-A",
-            "60": "TOR-A", "48": "TOR-A",
-            "242": "TWN-A",
-        },
-        "172": {
-            "16": "MTL-A", "17": "MTL-A",
-        },
-    }
-
-    for ip in ip_list:
-        try:
-            ip_octets = ip.split(".")
-
-            if len(ip_octets) != 4:
-                continue
-
-            first_octet, second_octet = ip_octets[0], ip_octets[1]
-            if first_octet in site_map and second_octet in site_map[first_octet]:
-                return (site_map[first_octet][second_octet], ip)
-
-        except Exception as e:
-            logging.error(f"Failed to parse IP: {ip}. Error: {e}")
-
-    return (None, None)
+    return get_site_index().decide(ip_list)
 
-def jira_set_site(object_id, object_type, site):
+def get_site_update(object_type, site):
     """
-    Updates the site of an object in Jira.
+    Resolves the attribute and the referenced site object used to set a site.
 
     Args:
-        object_id (str): The ID of the object.
         object_type (str): The type of object (host, virtual guest, or device).
-        site (str): The site to update.
+        site (str): The site to set.
 
     Returns:
-        bool: True if the update is successful, False otherwise.
+        tuple: The attribute ID and site object ID, or (None, None) if either is unknown.
     """
     attribute_id = {
         "host": HOST_SITE_ATTRIBUTE_ID,
@@ -471,20 +961,36 @@ def jira_set_site(object_id, object_type, site):
 
     if not attribute_id or not site_object_id:
         logging.error(f"Unknown object type or site: {object_type}, {site}")
+        return None, None
+    return attribute_id, site_object_id
+
+def jira_set_site(object_id, object_type, site, write_buffer=None):
+    """
+    Updates the site of an object in Jira.
+
+    Args:
+        object_id (str): The ID of the object.
+        object_type (str): The type of object (host, virtual guest, or device).
+        site (str): The site to update.
+        write_buffer (ObjectWriteBuffer): Queue the change on this buffer instead of sending it now.
+
+    Returns:
+        bool: True if the update is successful (or was queued), False otherwise.
+    """
+    attribute_id, site_object_id = get_site_update(object_type, site)
+    if not attribute_id:
         return False
 
-    payload = {
-        "attributes": [
-            {
-                "objectTypeAttributeId": attribute_id,
-                "objectAttributeValues": [{"value": site_object_id}],
-            }
-        ]
-    }
+    if write_buffer is not None:
+        write_buffer.add(attribute_id, [{"value": site_object_id}], [{"value": site_object_id, "displayValue": site}], f"Site to {site}")
+        return True
+
+    payload = build_attribute_payload(attribute_id, [{"value": site_object_id}])
 
     response = make_jira_request("PUT", f"/object/{object_id}", data=payload)
     if response:
-        logging.info(f"Updated Site for {object_id}: {site}")
+        object_logger.info("Updated Site for %s: %s", object_id, site)
+        patch_attribute_snapshot(object_id, attribute_id, [{"value": site_object_id, "displayValue": site}])
         return True
     else:
         logging.error(f"Failed to update Site for {object_id}")
@@ -511,13 +1017,9 @@ def get_host_name(object_id, type):
         logging.error(f"Unknown type: {type}")
         return None
 
-    response = make_jira_request("GET", f"/object/{object_id}/attributes")
-    if response:
-        for item in response:
-            if item["objectTypeAttributeId"] == attribute_id:
-                for attribute_value in item["objectAttributeValues"]:
-                    if "value" in attribute_value:
-                        return attribute_value["value"]
+    for attribute_value in get_attribute_values(object_id, attribute_id):
+        if "value" in attribute_value:
+            return attribute_value["value"]
 
     logging.info(f"Failed to retrieve hostname for {object_id}")
     return None
@@ -527,25 +1029,73 @@ def get_ip_address(host_name):
     """
     Retrieves the IP address for a given hostname.
 
+    Lookups go through the shared DNS resolver, which caches answers and unresolvable names.
+
     Args:
         host_name (str): The hostname for which to retrieve the IP address.
 
     Returns:
         str or None: The IP address of the hostname, or None if not found or an error occurs.
     """
-    max_retries = 5  # Maximum number of retries
-    wait_time = 2    # Time to wait between retries (in seconds)
+    return get_resolver().resolve(host_name)
 
-    for attempt in range(max_retries):
-        try:
-            return socket.gethostbyname(host_name)
-        except socket.gaierror as e:
-            if attempt < max_retries - 1:
-                logging.info(f"Attempt {attempt + 1} failed for {host_name}, retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                logging.error(f"Failed to retrieve IP address for {host_name} after {max_retries} attempts: {e}")
-                return None
+def get_ip_addresses(host_names):
+    """
+    Retrieves the IP addresses of several hostnames concurrently.
+
+    Args:
+        host_names (list): The hostnames for which to retrieve the IP addresses.
+
+    Returns:
+        dict: The IP address of every hostname, or None for the ones that cannot be resolved.
+    """
+    return get_resolver().resolve_many(host_names)
+
+def jira_get_object_site(object_id, object_type):
+    """
+    Retrieves the sites currently set on an object in Jira.
+
+    Args:
+        object_id (str): The ID of the object.
+        object_type (str): The type of object (host, virtual guest, or device).
+
+    Returns:
+        list: The display values of the site attribute.
+    """
+    attribute_id = {
+        "host": HOST_SITE_ATTRIBUTE_ID,
+        "virtual guest": GUESTVM_SITE_ATTRIBUTE_ID,
+        "device": DEVICE_SITE_ATTRIBUTE_ID,
+    }.get(object_type)
+
+    if not attribute_id:
+        logging.error(f"Unknown object type: {object_type}")
+        return []
+
+    return [value["displayValue"] for value in get_attribute_values(object_id, attribute_id) if "displayValue" in value]
+
+def jira_get_object_device_type(object_id, object_type):
+    """
+    Retrieves the device types currently set on an object in Jira.
+
+    Args:
+        object_id (str): The ID of the object.
+        object_type (str): The type of object (host, virtual guest, or device).
+
+    Returns:
+        list: The display values of the device type attribute.
+    """
+    attribute_id = {
+        "host": HOST_DEVICE_TYPE_ATTRIBUTE_ID,
+        "virtual guest": GUESTVM_DEVICE_TYPE_ATTRIBUTE_ID,
+        "device": DEVICE_DEVICE_TYPE_ATTRIBUTE_ID,
+    }.get(object_type)
+
+    if not attribute_id:
+        logging.error(f"Unknown object type: {object_type}")
+        return []
+
+    return [value["displayValue"] for value in get_attribute_values(object_id, attribute_id) if "displayValue" in value]
 
 def check_if_site_needs_update(object_type, object_id, site):
     """
@@ -569,56 +1119,294 @@ def check_if_site_needs_update(object_type, object_id, site):
         logging.error(f"Unknown object type: {object_type}")
         return False
 
-    response = make_jira_request("GET", f"/object/{object_id}/attributes")
-    if response:
-        for item in response:
-            if item["objectTypeAttributeId"] == attribute_id:
-                for value in item["objectAttributeValues"]:
-                    if value.get("displayValue") == site:
-                        return True
-
-    return False
+    return any(value.get("displayValue") == site for value in get_attribute_values(object_id, attribute_id))
 
-def jira_set_ip_address(object_type, object_id, ip_address):
+def get_network_attribute_id(object_type):
+    """
+    Returns the network attribute ID for the object type, or None if the type is unknown.
+    """
     attribute_id = {
         "host": HOST_NETWORK_ATTRIBUTE_ID,
         "virtual guest": GUESTVM_NETWORK_ATTRIBUTE_ID,
         "device": DEVICE_NETWORK_ATTRIBUTE_ID,
     }.get(object_type)
 
-    object_type_id = "36"
-
     if not attribute_id:
         logging.error(f"Unknown object type: {object_type}")
-        return
+    return attribute_id
 
-    # Create IP Network Object
-    payload = {
-        "objectTypeId": object_type_id,
+def build_network_object_payload(ip_address):
+    """
+    Builds the /object/create payload for a new IP network object.
+    """
+    return {
+        "objectTypeId": "36",
         "attributes": [
             {"objectTypeAttributeId": NETWORK_OBJECT_NAME_ATTRIBUTE_ID, "objectAttributeValues": [{"value": ip_address}]},
             {"objectTypeAttributeId": NETWORK_OBJECT_IP4_ATTRIBUTE_ID, "objectAttributeValues": [{"value": ip_address}]},
         ]
     }
 
-    response = make_jira_request("POST", "/object/create", data=payload)
-    if response and response.status_code == 201:
-        logging.info(f"Created network object for {ip_address}")
-        network_object_id = response["id"]
+def index_network_objects(object_entries, network_objects):
+    """
+    Adds navlist entries of IP network objects to the index, keyed by their IPv4 address.
+    """
+    for object_entry in object_entries:
+        ip_values = index_attributes(object_entry.get("attributes", [])).get(str(NETWORK_OBJECT_IP4_ATTRIBUTE_ID), {}).get("objectAttributeValues", [])
+        ip_address = ip_values[0].get("value") if ip_values else object_entry.get("label")
+        if ip_address:
+            network_objects.setdefault(ip_address, object_entry["id"])
+
+def load_network_object_index(refresh=False):
+    """
+    Loads every IP network object into an in-memory index of object IDs by IPv4 address.
+
+    The index is loaded once per run and kept up to date as network objects are created, so the
+    IP backfill reuses existing network objects instead of creating duplicates. An index missing
+    any page could lead to duplicates too, so if any page fails the index is unavailable for the
+    rest of the run, unless refreshed.
+
+    Args:
+        refresh (bool): Reload the index even if it is already loaded or failed to load.
+
+    Returns:
+        dict or None: The index, or None if it could not be loaded completely.
+    """
+    global _network_objects, _network_objects_failed
+    with _network_objects_lock:
+        if not refresh:
+            if _network_objects is not None:
+                return _network_objects
+            if _network_objects_failed:
+                return None
+
+        status = SweepStatus()
+        object_entries = jira_load_navlist_entries(
+            lambda page: build_attribute_navlist_payload(
+                NETWORK_OBJECT_TYPE_ID, f"objectTypeId = {NETWORK_OBJECT_TYPE_ID}",
+                [NETWORK_OBJECT_NAME_ATTRIBUTE_ID, NETWORK_OBJECT_IP4_ATTRIBUTE_ID], page,
+            ),
+            "IP network objects",
+            status,
+        )
+        if object_entries is None or not status.complete:
+            logging.error("Failed to load every IP network object, no network objects will be created this run")
+            _network_objects = None
+            _network_objects_failed = True
+            return None
+
+        network_objects = {}
+        index_network_objects(object_entries, network_objects)
+        logging.info(f"Loaded {len(network_objects)} IP network objects")
+        _network_objects = network_objects
+        _network_objects_failed = False
+        return _network_objects
+
+def get_or_create_network_object(ip_address):
+    """
+    Returns the ID of the IP network object for the address, creating it if it does not exist yet.
+
+    Nothing is created while the network object index is unavailable, since the address might
+    already have a network object.
+
+    Returns:
+        str or None: The network object ID, or None if it could not be found or created.
+    """
+    network_objects = load_network_object_index()
+    if network_objects is None:
+        object_logger.info("Not creating a network object for %s, the network object index is unavailable", ip_address)
+        return None
+    network_object_id = network_objects.get(ip_address)
+    if network_object_id is not None:
+        return network_object_id
+
+    # One creation per address, even when several objects share it
+    with _network_objects_lock:
+        create_lock = _network_create_locks.setdefault(ip_address, threading.Lock())
+    with create_lock:
+        network_object_id = network_objects.get(ip_address)
+        if network_object_id is not None:
+            return network_object_id
+
+        response = make_jira_request("POST", "/object/create", data=build_network_object_payload(ip_address))
+        if response and "id" in response:
+            object_logger.info("Created network object for %s", ip_address)
+            network_objects[ip_address] = response["id"]
+            return response["id"]
+
+    logging.error(f"Failed to create network object for {ip_address}")
+    return None
+
+def jira_set_ip_address(object_type, object_id, ip_address, write_buffer=None):
+    attribute_id = get_network_attribute_id(object_type)
+    if not attribute_id:
+        return False
+
+    # Find or create the IP Network Object
+    network_object_id = get_or_create_network_object(ip_address)
+    if network_object_id is None:
+        return False
+
+    # Add IP Network object to object, together with the object's other changes if they are buffered
+    if write_buffer is not None:
+        write_buffer.add(attribute_id, [{"value": network_object_id}], [{"value": network_object_id, "displayValue": ip_address}], f"IP to {ip_address}")
+        return True
+
+    payload = build_attribute_payload(attribute_id, [{"value": network_object_id}])
+
+    response = make_jira_request("PUT", f"/object/{object_id}", data=payload)
+    if response:
+        object_logger.info("Updated IP for %s: %s", object_id, ip_address)
+        patch_attribute_snapshot(object_id, attribute_id, [{"value": network_object_id, "displayValue": ip_address}])
+        return True
     else:
-        logging.error(f"Failed to create network object for {ip_address}")
+        logging.error(f"Failed to update IP for {object_id}: {ip_address}")
+        return False
+
+# Async counterparts of the request helpers above, used by the async engine in main.py.
+# They share the payload builders and the attribute snapshots with the synchronous helpers,
+# so the snapshot getters and "needs update" checks work unchanged once the data is loaded.
+
+async def jira_get_object_attributes_async(object_id, refresh=False, updated=None):
+    """
+    Async version of jira_get_object_attributes.
+    """
+    object_id = str(object_id)
+    if not refresh:
+        if object_id in _attribute_snapshots:
+            return _attribute_snapshots[object_id]
+        snapshot = get_cached_attributes(object_id, updated)
+        if snapshot is not None:
+            return snapshot
+
+    with get_metrics().time_phase("read attributes"):
+        response = await make_jira_request_async("GET", f"/object/{object_id}/attributes")
+    if response is None:
+        return None
+
+    return store_fetched_attributes(object_id, response, updated)
+
+@timed_phase("enumerate")
+async def jira_get_navlist_page_async(object_type: str, page: int, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None):
+    """
+    Async version of jira_get_navlist_page.
+    """
+    payload = build_navlist_payload(object_type, page, include_attributes, page_size, updated_since)
+    data = await make_jira_request_async("POST", "/object/navlist/aql", data=payload)
+    if data:
+        logging.info(f"Adding page {page} of {data['pageSize']}")
+        if include_attributes:
+            seed_navlist_snapshots(data["objectEntries"], object_type)
+    else:
+        logging.error(f"Failed to retrieve objects for {object_type} failure occurred at {page}, refer to previous errors for api call errors.")
+    return data
+
+async def jira_iter_objects_async(object_type: str, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None, status=None):
+    """
+    Async version of jira_iter_objects.
+    """
+    first_page = await jira_get_navlist_page_async(object_type, 1, include_attributes, page_size, updated_since)
+    if not first_page:
+        if status is not None:
+            status.page_failed()
         return
 
-    # Add IP Network object to object
-    payload = {
-        "attributes": [
-            {"objectTypeAttributeId": attribute_id, "objectAttributeValues": [{"value": network_object_id}]}
-        ]
-    }
+    pages = first_page["pageSize"]
+    next_page = 2
+    pending = deque()
 
-    response = make_jira_request("PUT", f"/object/{object_id}", data=payload)
-    if response and response.status_code == 200:
-        logging.info(f"Updated IP for {object_id}: {ip_address}")
+    def prefetch():
+        nonlocal next_page
+        while next_page <= pages and len(pending) < PAGE_FETCH_WORKERS:
+            pending.append(asyncio.ensure_future(
+                jira_get_navlist_page_async(object_type, next_page, include_attributes, page_size, updated_since)
+            ))
+            next_page += 1
+
+    try:
+        prefetch()
+        for object_entry in first_page["objectEntries"]:
+            yield object_entry
+        while pending:
+            data = await pending.popleft()
+            prefetch()
+            if data:
+                for object_entry in data["objectEntries"]:
+                    yield object_entry
+            elif status is not None:
+                status.page_failed()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def jira_get_objects_async(object_type: str, include_attributes: bool = False, page_size: int = PAGE_SIZE, updated_since=None):
+    """
+    Async version of jira_get_objects.
+    """
+    return [object_entry async for object_entry in jira_iter_objects_async(object_type, include_attributes, page_size, updated_since)]
+
+async def get_or_create_network_object_async(ip_address):
+    """
+    Async version of get_or_create_network_object.
+    """
+    network_objects = _network_objects
+    if network_objects is None and not _network_objects_failed:
+        loop = asyncio.get_running_loop()
+        network_objects = await loop.run_in_executor(None, load_network_object_index)
+    if network_objects is None:
+        object_logger.info("Not creating a network object for %s, the network object index is unavailable", ip_address)
+        return None
+    network_object_id = network_objects.get(ip_address)
+    if network_object_id is not None:
+        return network_object_id
+
+    create_lock = _network_create_async_locks.setdefault(ip_address, asyncio.Lock())
+    async with create_lock:
+        network_object_id = network_objects.get(ip_address)
+        if network_object_id is not None:
+            return network_object_id
+
+        response = await make_jira_request_async("POST", "/object/create", data=build_network_object_payload(ip_address))
+        if response and "id" in response:
+            object_logger.info("Created network object for %s", ip_address)
+            network_objects[ip_address] = response["id"]
+            return response["id"]
+
+    logging.error(f"Failed to create network object for {ip_address}")
+    return None
+
+async def jira_set_ip_address_async(object_type, object_id, ip_address, write_buffer=None):
+    """
+    Async version of jira_set_ip_address.
+    """
+    attribute_id = get_network_attribute_id(object_type)
+    if not attribute_id:
+        return False
+
+    # Find or create the IP Network Object
+    network_object_id = await get_or_create_network_object_async(ip_address)
+    if network_object_id is None:
+        return False
+
+    # Add IP Network object to object, together with the object's other changes if they are buffered
+    if write_buffer is not None:
+        write_buffer.add(attribute_id, [{"value": network_object_id}], [{"value": network_object_id, "displayValue": ip_address}], f"IP to {ip_address}")
+        return True
+
+    payload = build_attribute_payload(attribute_id, [{"value": network_object_id}])
+
+    response = await make_jira_request_async("PUT", f"/object/{object_id}", data=payload)
+    if response:
+        object_logger.info("Updated IP for %s: %s", object_id, ip_address)
+        patch_attribute_snapshot(object_id, attribute_id, [{"value": network_object_id, "displayValue": ip_address}])
+        return True
     else:
         logging.error(f"Failed to update IP for {object_id}: {ip_address}")
+        return False
 
+async def get_ip_address_async(host_name):
+    """
+    Async version of get_ip_address; the blocking lookup runs in the event loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, get_ip_address, host_name)
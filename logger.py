@@ -1,14 +1,124 @@
-import logging, sys
+from config import get_env_variable
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import copy
+import logging
+import os
+import queue
+import random
+import sys
 
-def setup_logging(log_file, level=logging.INFO):
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MAX_BYTES = int(get_env_variable("LOG_MAX_BYTES", 50 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(get_env_variable("LOG_BACKUP_COUNT", 3))
+# Fraction of the per-object INFO lines that are written; warnings and errors are always written
+LOG_OBJECT_SAMPLE_RATE = float(get_env_variable("LOG_OBJECT_SAMPLE_RATE", 1.0))
+
+# Logger for the lines written for every object in a sweep, so they can be sampled
+object_logger = logging.getLogger("objects")
+
+_listener = None
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the writer thread.
+
+    The stock QueueHandler formats every record in the logging thread so that it can be pickled;
+    the queue here never leaves the process, so the record is passed on with its arguments as is.
+    """
+
+    def prepare(self, record):
+        return copy.copy(record)
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through only a fraction of the INFO and DEBUG records of a logger and its children.
+    Records of other loggers and records at WARNING and above always pass.
+
+    Args:
+        name (str): The logger whose records are sampled.
+        rate (float): The fraction of its records to keep, between 0 and 1.
+    """
+
+    def __init__(self, name, rate):
+        super().__init__()
+        self.sampled_name = name
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        if record.name != self.sampled_name and not record.name.startswith(self.sampled_name + "."):
+            return True
+        return random.random() < self.rate
+
+def setup_logging(log_file, level=logging.INFO, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, object_sample_rate=LOG_OBJECT_SAMPLE_RATE):
     """
     Sets up logging configuration.
 
+    Records are put on a queue and written to the log file and stdout by a background thread,
+    so logging never waits on disk or console I/O. The log file starts empty on every run; the
+    previous logs are kept as log_file.1, log_file.2, ... and the file is rotated whenever it
+    grows past max_bytes.
+
     Args:
         log_file (str): Path to the log file.
         level: Logging level. Default is logging.INFO.
+        max_bytes (int): Size at which the log file is rotated, 0 to never rotate.
+        backup_count (int): Number of rotated log files to keep.
+        object_sample_rate (float): Fraction of the per-object INFO lines to write.
+
+    Returns:
+        QueueListener: The listener writing the records.
+    """
+    global _listener
+    stop_logging()
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    if os.path.exists(log_file) and os.path.getsize(log_file) > 0:
+        file_handler.doRollover()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+    queue_handler.addFilter(SampleFilter(object_logger.name, object_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def flush_logging():
     """
-    logging.basicConfig(level=level,
-                        format='%(asctime)s - %(levelname)s - %(message)s',
-                        handlers=[logging.FileHandler(log_file, mode="w"), logging.StreamHandler(sys.stdout)])
-    
+    Waits until every record logged so far is written and flushed, e.g. before the log file is sent.
+    """
+    if _listener is None:
+        return
+    # Stopping the listener drains the queue; it is started again to keep logging
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.flush()
+    _listener.start()
+
+def stop_logging():
+    """
+    Writes the remaining records and stops the writer thread.
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+atexit.register(stop_logging)
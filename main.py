@@ -1,8 +1,18 @@
-from logger import setup_logging
+from logger import flush_logging, object_logger, setup_logging
 from config import get_local_dir, get_env_variable
-from email_handler import send_email, compose_email
+from email_handler import close_smtp_connection, send_email, compose_email
 from jira_utils import *
-from veeam import veeam_get_backup_report
+from api_handler import close_async_jira_session
+from veeam import configure_report_cache, veeam_get_backup_report
+from sync_plan import apply_plan, apply_plan_entry, apply_plan_entry_async, build_plan, map_bounded, plan_object, resolve_hostnames_ahead, write_plan
+from dns_resolver import configure_resolver
+from metrics import get_metrics
+from profiling import RunProfiler
+from sync_state import get_updated_since, load_sync_state, record_successful_run, save_sync_state
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import html
 import logging
 import schedule
 import time
@@ -10,111 +20,269 @@ import sys
 
 # Constants
 LOG_FILE = get_local_dir() + "/log.log"
+PLAN_FILE = get_local_dir() + "/plan.json"
+SYNC_STATE_FILE = get_local_dir() + "/sync_state.json"
+INVENTORY_CACHE_FILE = get_local_dir() + "/inventory_cache.sqlite3"
+DNS_CACHE_FILE = get_local_dir() + "/dns_cache.json"
+VEEAM_CACHE_DIR = get_local_dir() + "/veeam_cache"
+METRICS_PROMETHEUS_FILE = get_local_dir() + "/metrics.prom"
+METRICS_JSON_FILE = get_local_dir() + "/metrics.json"
+PROFILE_FILE = get_local_dir() + "/profile.prof"
+PROFILE_SUMMARY_FILE = get_local_dir() + "/profile.txt"
 SENDER_EMAIL = get_env_variable("SENDER_EMAIL")
 SEND_TO_EMAIL = get_env_variable("SEND_TO_EMAIL")
 
-def main():
+def main(workers=1, engine="sync", plan=False, dry_run=False, plan_file=None, incremental=False, full=False, cache=True, profile=False, inventory_cache=False):
     """
     Main function.
+
+    Args:
+        workers (int): Number of objects processed concurrently during the site location update.
+        engine (str): "sync" to process objects on a thread pool, "async" to run them on one event loop.
+        plan (bool): Plan every object first and then apply only the changed ones.
+        dry_run (bool): Plan every object and write the plan without applying it.
+        plan_file (str): Where to write the plan in plan and dry-run mode.
+        incremental (bool): Only process objects updated since the last successful run.
+        full (bool): Run a full sweep even in incremental mode.
+        cache (bool): Keep DNS answers and Veeam reports in on-disk caches between runs.
+        profile (bool): Profile the run and write the profile and a hotspot summary next to the log.
+        inventory_cache (bool): Also keep object attributes in the on-disk inventory cache.
     """
+    if profile:
+        with RunProfiler(PROFILE_FILE, PROFILE_SUMMARY_FILE, get_metrics()):
+            return main(workers, engine, plan, dry_run, plan_file, incremental, full, cache, False, inventory_cache)
     object_types = ["host", "device", "virtual guest"]
     setup_logging(LOG_FILE, logging.DEBUG)
     logging.info("Started logging...")
+    attribute_cache = configure_inventory_cache(INVENTORY_CACHE_FILE if inventory_cache else None)
+    if attribute_cache is not None:
+        attribute_cache.evict_stale()
+    dns_resolver = configure_resolver(DNS_CACHE_FILE if cache else None)
+    configure_report_cache(VEEAM_CACHE_DIR if cache else None)
     # logging.info("Starting Veeam Backup Location Update")
     # logging.info("grabbing backup locations from Veeam Report")
-    # report = veeam_get_backup_report()
+    # with get_metrics().time_phase("veeam report"):
+    #     report = veeam_get_backup_report()
     # if report is None:
     #     logging.info("No backup locations found from Veeam")
     #     sys.exit()
 
     # logging.info("Finished grabbing backup locations from Veeam Report")
+    # hostname_index = jira_load_hostname_index()
+    # if hostname_index is None:
+    #     logging.error("Failed to load the host names, searching Jira for every VM instead")
     # failed_list = []
     # for vm_name in report:
     #     logging.info(vm_name)
-    #     process_vm(vm_name, report, failed_list)
+    #     process_vm(vm_name, report, failed_list, hostname_index)
 
     # prepare_and_send_email(failed_list)
     # logging.info("Finished sending emails")
     logging.info("Starting Site Location Update Schedule")
-    for object_type in object_types:
-        logging.info(f"Processing {object_type} objects")
-        jira_update_site_location(object_type)
+    started_at = datetime.now(timezone.utc)
+    sync_state = load_sync_state(SYNC_STATE_FILE)
+    updated_since = get_updated_since(sync_state, force_full=full) if incremental else None
+    if updated_since is not None:
+        logging.info(f"Incremental run, processing objects updated since {updated_since}")
+    else:
+        logging.info("Full sweep, processing every object")
+
+    status = SweepStatus()
+    if plan or dry_run:
+        run_site_location_plan(object_types, workers, plan_file or PLAN_FILE, dry_run, updated_since, status)
+    elif engine == "async":
+        with get_metrics().time_phase("site sync"):
+            asyncio.run(run_site_location_update_async(object_types, workers, updated_since, status))
+    else:
+        with get_metrics().time_phase("site sync"):
+            for object_type in object_types:
+                logging.info(f"Processing {object_type} objects")
+                jira_update_site_location(object_type, workers, updated_since, status)
+
+    dns_resolver.save()
+    if attribute_cache is not None and updated_since is None and status.failed_pages == 0:
+        # Every object still in Jira was seen during a full sweep that loaded every page, so the rest were deleted
+        for object_type in object_types:
+            attribute_cache.evict_unseen(object_type, started_at)
+
+    if not status.complete:
+        # Objects missed by this run are only picked up again if the watermark stays where it was
+        logging.error(
+            f"{status.failed_pages} pages and {status.failed_objects} objects failed, "
+            f"keeping the last watermark so the next run processes them again"
+        )
+    elif not dry_run:
+        save_sync_state(record_successful_run(sync_state, started_at, updated_since is None), SYNC_STATE_FILE)
 
+    get_metrics().write(METRICS_PROMETHEUS_FILE, METRICS_JSON_FILE)
+    logging.info(f"Run metrics:\n{get_metrics().summary()}")
+    # Reports sent during the run share one connection to the mail relay
+    close_smtp_connection()
+
+
+def process_vm(vm_name, report, failed_list, hostname_index=None):
+    """
+    Sets the backup location of the Jira object for a VM in the Veeam report.
+
+    With a hostname index the object is matched locally and only changed backup locations are
+    written; without one, the object and its attributes are looked up in Jira.
+    """
+    if hostname_index is None:
+        return search_and_process_vm(vm_name, report, failed_list)
+    try:
+        entry = hostname_index.find(vm_name)
+        if entry is not None:
+            object_logger.info("Label: %s, ObjectKey: %s", entry["label"], entry["object_key"])
+            if has_valid_install_status(entry["install_status"]):
+                if entry["backup_location"] == report[vm_name]:
+                    object_logger.info("Found %s already set for %s, skipping.", report[vm_name], entry["object_key"])
+                else:
+                    object_logger.info("Label: %s, ObjectKey: %s, Backup Location: %s", entry["label"], entry["object_key"], report[vm_name])
+                    update_backup_location(entry["object_key"], report[vm_name], entry["object_type"])
+                    entry["backup_location"] = report[vm_name]
+        else:
+            logging.info("%s does not exist, adding to failed list", vm_name)
+            failed_list.append(vm_name)
+    except Exception as e:
+        logging.info(f"Error processing VM {vm_name}: {e}")
+        failed_list.append(vm_name)
 
-def process_vm(vm_name, report, failed_list):
+def search_and_process_vm(vm_name, report, failed_list):
     try:
         label, object_key, type = object_type_search(vm_name)
         if label is not None:
-            logging.info(f"Label: {label}, ObjectKey: {object_key}")
+            object_logger.info("Label: %s, ObjectKey: %s", label, object_key)
             install_status = install_status_check(object_key, type)
             if install_status:
                 backup_location_set = object_attribute_search(object_key, report[vm_name], type)
                 if not backup_location_set:
-                    logging.info(f"Label: {label}, ObjectKey: {object_key}, Backup Location: {report[vm_name]}")
+                    object_logger.info("Label: %s, ObjectKey: %s, Backup Location: %s", label, object_key, report[vm_name])
                     update_backup_location(object_key, report[vm_name], type)
+            clear_attribute_snapshots(object_key)
         else:
-            logging.info(f"{vm_name} does not exist, adding to failed list")
+            logging.info("%s does not exist, adding to failed list", vm_name)
             failed_list.append(vm_name)
     except Exception as e:
         logging.info(f"Error processing VM {vm_name}: {e}")
         failed_list.append(vm_name)
 
-def update_site_for_object(object_id, object_type, object_ip_list):
-    host_site, ip_used = decide_site_from_ip(object_ip_list)
-    if host_site is not None:
-        logging.info(f"{host_site} decided for {object_id} from {ip_used}")
-        site_set = check_if_site_needs_update(object_type, object_id, host_site)
-        if not site_set:
-            jira_set_site(object_id, object_type, host_site)
-        else:
-            logging.info(f"Site already set for {object_id}")
-
-def update_device_type_for_object(object_id, object_type, operating_system):
-    device_type = decide_device_type_from_os(operating_system, object_type)
-    if device_type is not None:
-        logging.info(f"{device_type} decided for {object_id}")
-        device_type_set = check_if_device_type_needs_update(object_type, object_id, device_type)
-        if not device_type_set:
-            jira_set_device_type(object_id, object_type, device_type)
-        else:
-            logging.info(f"Device type already set for {object_id}")
-
-def jira_update_site_location(object_type):
-    object_data_list = jira_get_objects(object_type)
-    for object_data in object_data_list:
-
-        object_id = object_data["id"]
-        host_name = object_data["label"]
-        logging.info(f"Working on {object_id}, {host_name}")
-
-        # Update IP Address
-        object_ip_list = jira_get_object_ip_details(object_id, object_type)
-        if not object_ip_list:
-            logging.info(f"No IP set in jira for {object_id}, getting IP from hostname")
-            ip_address = get_ip_address(host_name)
-            if ip_address:
-                logging.info(f"Found IP: {ip_address}")
-                object_ip_list.append(ip_address)
-                jira_set_ip_address(object_type, object_id, ip_address)
-
-        # Update Site
-        if object_ip_list:
-            update_site_for_object(object_id, object_type, object_ip_list)
-        else:
-            logging.info(f"Failed to decide site for {object_id} from {object_ip_list}")
-
-        # Update Device Type
-        if object_type in ["host", "virtual guest"]:
-            operating_system = jira_get_object_os(object_id, object_type)
-            if operating_system:
-                update_device_type_for_object(object_id, object_type, operating_system)
-        elif object_type == "device":
-            model = jira_get_object_model(object_id, object_type)
-            if model:
-                update_device_type_for_object(object_id, object_type, model)
+def process_object(object_data, object_type, status=None):
+    """
+    Updates the IP address, site and device type of a single object.
+
+    The changes are planned from the object's snapshot and sent to Jira as one update.
+    Errors are logged, counted in status if given, and contained so that one failing object
+    does not stop the sweep.
+    """
+    object_id = object_data["id"]
+    host_name = object_data["label"]
+    try:
+        object_logger.info("Working on %s, %s", object_id, host_name)
+        if not apply_plan_entry(plan_object(object_data, object_type)) and status is not None:
+            status.object_failed()
+    except Exception as e:
+        logging.error(f"Error processing {object_type} {object_id}, {host_name}: {e}")
+        if status is not None:
+            status.object_failed()
+    finally:
+        # Each object is visited once per sweep, so its snapshot is no longer needed
+        clear_attribute_snapshots(object_id)
+
+def jira_update_site_location(object_type, workers=1, updated_since=None, status=None):
+    # Objects are streamed page by page, so processing starts with the first page
+    started = time.perf_counter()
+    processed = 0
+    object_data_iter = resolve_hostnames_ahead(
+        jira_iter_objects(object_type, include_attributes=True, updated_since=updated_since, status=status), object_type
+    )
+    for _ in map_bounded(lambda object_data: process_object(object_data, object_type, status), object_data_iter, workers, object_type):
+        processed += 1
+    get_metrics().record_objects(object_type, processed, time.perf_counter() - started)
 
     logging.info(f"Finished setting site for all {object_type} objects")
 
+def run_site_location_plan(object_types, workers=1, plan_file=None, dry_run=False, updated_since=None, status=None):
+    """
+    Runs the site and device type sync in two phases: plan every object, then apply the changes.
+
+    Args:
+        object_types (list): The object types to sync.
+        workers (int): The number of objects planned or updated concurrently.
+        plan_file (str): Where to write the plan; nothing is written if None.
+        dry_run (bool): Only write the plan, without changing anything in Jira.
+        updated_since (datetime): Only sync objects updated after this time.
+        status (SweepStatus): Counts the pages and objects that failed.
+    """
+    with get_metrics().time_phase("plan"):
+        plan = build_plan(object_types, workers, updated_since, status)
+    if plan_file:
+        write_plan(plan, plan_file)
+    if dry_run:
+        logging.info("Dry run, no changes were applied")
+        return
+    with get_metrics().time_phase("apply"):
+        apply_plan(plan, workers, status)
+
+async def process_object_async(object_data, object_type, status=None):
+    """
+    Async version of process_object.
+    """
+    object_id = object_data["id"]
+    host_name = object_data["label"]
+    try:
+        object_logger.info("Working on %s, %s", object_id, host_name)
+
+        # Load the snapshot up front so the attribute getters below never block the event loop
+        if await jira_get_object_attributes_async(object_id, updated=object_data.get("updated")) is None:
+            logging.error(f"Failed to retrieve attributes for object {object_id}, skipping")
+            if status is not None:
+                status.object_failed()
+            return
+
+        # Resolve the hostname on the executor only when Jira has no IP for the object
+        ip_address = None
+        if not jira_get_object_ip_details(object_id, object_type):
+            ip_address = await get_ip_address_async(host_name)
+
+        if not await apply_plan_entry_async(plan_object(object_data, object_type, lambda _: ip_address)) and status is not None:
+            status.object_failed()
+    except Exception as e:
+        logging.error(f"Error processing {object_type} {object_id}, {host_name}: {e}")
+        if status is not None:
+            status.object_failed()
+    finally:
+        clear_attribute_snapshots(object_id)
+
+async def jira_update_site_location_async(object_type, workers=1, updated_since=None, status=None):
+    # At most `workers` objects are in flight; the page stream waits while all slots are taken
+    slots = asyncio.Semaphore(workers)
+    tasks = set()
+    started = time.perf_counter()
+    processed = 0
+
+    def finish(task):
+        tasks.discard(task)
+        slots.release()
+
+    async for object_data in jira_iter_objects_async(object_type, include_attributes=True, updated_since=updated_since, status=status):
+        await slots.acquire()
+        task = asyncio.create_task(process_object_async(object_data, object_type, status))
+        tasks.add(task)
+        task.add_done_callback(finish)
+        processed += 1
+    await asyncio.gather(*tasks)
+    get_metrics().record_objects(object_type, processed, time.perf_counter() - started)
+
+    logging.info(f"Finished setting site for all {object_type} objects")
+
+async def run_site_location_update_async(object_types, workers=1, updated_since=None, status=None):
+    try:
+        for object_type in object_types:
+            logging.info(f"Processing {object_type} objects")
+            await jira_update_site_location_async(object_type, workers, updated_since, status)
+    finally:
+        await close_async_jira_session()
+
 def prepare_and_send_email(failed_list):
     if failed_list:
         email_subject = "with Failures"
@@ -122,8 +290,12 @@ def prepare_and_send_email(failed_list):
     else:
         email_subject = "with Success"
         email_body = "All backup locations were updated successfully"
+    # The body is HTML, so the plain-text summary keeps its lines and indentation in a <pre> block
+    email_body += f"<br><br>Run metrics:<pre>{html.escape(get_metrics().summary())}</pre>"
 
     composed_subject, composed_body = compose_email(email_subject, email_body)
+    # The log is attached, so everything logged so far must be on disk first
+    flush_logging()
     result = send_email(SENDER_EMAIL, composed_subject, composed_body, SEND_TO_EMAIL, LOG_FILE)
     if result:
         logging.info("Finished sending email")
@@ -131,8 +303,64 @@ def prepare_and_send_email(failed_list):
         logging.error(f"Failed to send email. \n {result}")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Update Jira Assets inventory information.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of objects to process concurrently (keep JIRA_POOL_SIZE at least this large)",
+    )
+    parser.add_argument(
+        "--engine", choices=["sync", "async"], default="sync",
+        help="run objects on a thread pool (sync) or on a single asyncio event loop (async)",
+    )
+    parser.add_argument(
+        "--plan", action="store_true",
+        help="plan every object first, then apply only the objects that need changes",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="write the plan without changing anything in Jira",
+    )
+    parser.add_argument(
+        "--plan-file", default=PLAN_FILE,
+        help=f"where to write the plan (default {PLAN_FILE})",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only process objects updated since the last successful run, with a periodic full sweep",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="force a full sweep in incremental mode",
+    )
+    parser.add_argument(
+        "--no-cache", dest="cache", action="store_false",
+        help=f"do not use the on-disk DNS and Veeam report caches ({DNS_CACHE_FILE}, {VEEAM_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--inventory-cache", action="store_true",
+        help=f"keep object attributes in {INVENTORY_CACHE_FILE}; only attributes read one object at a time are served from it",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help=f"profile the run and write {PROFILE_FILE} and a hotspot summary to {PROFILE_SUMMARY_FILE} (on Python 3.12+ only the main thread is profiled)",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (args.plan or args.dry_run) and args.engine != "sync":
+        parser.error("--plan and --dry-run run on the sync engine")
+    if args.incremental:
+        try:
+            get_jira_timezone()
+        except ValueError as e:
+            parser.error(f"--incremental: {e}")
+    return args
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(**vars(args))
     # schedule.every().sunday.at("02:00").do(main)
     # while True:
     #     schedule.run_pending()
@@ -0,0 +1,289 @@
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import functools
+import json
+import re
+import threading
+import time
+
+# Upper bounds of the request latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The innermost phase being timed in the current thread or asyncio task
+_current_phase = ContextVar("current_phase", default=None)
+
+class PhaseFrame:
+    """
+    A phase being timed, with the time spent in phases nested inside it by the same thread or task.
+    """
+    __slots__ = ("owner", "nested")
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.nested = 0.0
+
+def phase_owner():
+    """
+    Identifies the current thread and asyncio task, so time is only subtracted from a phase by
+    phases nested inside it in the same flow of execution, not by concurrent tasks that inherited it.
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return threading.get_ident(), id(task) if task is not None else None
+
+def endpoint_template(endpoint):
+    """
+    Replaces the object IDs in an endpoint with a placeholder, so that e.g. every
+    /object/{id}/attributes request is counted under one endpoint.
+    """
+    return re.sub(r"/\d+(?=/|$)", "/{id}", endpoint.split("?")[0])
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, in the shape of a Prometheus histogram.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-quantile, or None for an empty histogram.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+class Metrics:
+    """
+    Run metrics: Jira request latencies per method and endpoint template, retry and failure counts,
+    objects processed per object type, and the duration of each phase of the run.
+
+    Safe to update from several threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.latencies = {}
+            self.responses = Counter()
+            self.retries = Counter()
+            self.failures = Counter()
+            self.objects = {}
+            self.phases = {}
+
+    def observe_request(self, method, endpoint, seconds, status):
+        """
+        Records one request attempt; status is the HTTP status, or "error" if no response arrived.
+        """
+        key = (method, endpoint_template(endpoint))
+        with self.lock:
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = Histogram()
+            histogram.observe(seconds)
+            self.responses[key + (str(status),)] += 1
+
+    def count_retry(self, method, endpoint, status):
+        with self.lock:
+            self.retries[(method, endpoint_template(endpoint), str(status))] += 1
+
+    def count_failure(self, method, endpoint, status):
+        with self.lock:
+            self.failures[(method, endpoint_template(endpoint), str(status))] += 1
+
+    def record_objects(self, object_type, count, seconds):
+        """
+        Adds objects of a type processed in the given number of seconds.
+        """
+        with self.lock:
+            processed = self.objects.setdefault(object_type, {"count": 0, "seconds": 0.0})
+            processed["count"] += count
+            processed["seconds"] += seconds
+
+    def record_phase(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def time_phase(self, phase):
+        """
+        Adds the time spent in the with block to the phase, minus the time spent in phases nested
+        inside it, so every second is counted under one phase only. Phases timed in several threads
+        or tasks at once add up their time.
+        """
+        owner = phase_owner()
+        parent = _current_phase.get()
+        frame = PhaseFrame(owner)
+        token = _current_phase.set(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_phase.reset(token)
+            self.record_phase(phase, elapsed - frame.nested)
+            if parent is not None and parent.owner == owner:
+                parent.nested += elapsed
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "started": self.started,
+                "duration_seconds": time.time() - self.started,
+                "requests": [
+                    {"method": method, "endpoint": endpoint, **histogram.to_dict()}
+                    for (method, endpoint), histogram in sorted(self.latencies.items())
+                ],
+                "responses": [
+                    {"method": method, "endpoint": endpoint, "status": status, "count": count}
+                    for (method, endpoint, status), count in sorted(self.responses.items())
+                ],
+                "retries": [
+                    {"method": method, "endpoint": endpoint, "status": status, "count": count}
+                    for (method, endpoint, status), count in sorted(self.retries.items())
+                ],
+                "failures": [
+                    {"method": method, "endpoint": endpoint, "status": status, "count": count}
+                    for (method, endpoint, status), count in sorted(self.failures.items())
+                ],
+                "objects": {
+                    object_type: dict(processed, per_second=processed["count"] / processed["seconds"] if processed["seconds"] else 0.0)
+                    for object_type, processed in sorted(self.objects.items())
+                },
+                "phases": dict(sorted(self.phases.items())),
+            }
+
+    def to_prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        metrics = self.to_dict()
+        lines = [
+            "# HELP jira_request_duration_seconds Latency of Jira API request attempts.",
+            "# TYPE jira_request_duration_seconds histogram",
+        ]
+        for request in metrics["requests"]:
+            labels = f'method="{request["method"]}",endpoint="{request["endpoint"]}"'
+            cumulative = 0
+            for bound, count in request["buckets"].items():
+                cumulative += count
+                lines.append(f'jira_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"jira_request_duration_seconds_sum{{{labels}}} {request['sum']}")
+            lines.append(f"jira_request_duration_seconds_count{{{labels}}} {request['count']}")
+        for name, key, help_text in (
+            ("jira_responses_total", "responses", "Jira API request attempts by response status."),
+            ("jira_request_retries_total", "retries", "Jira API requests retried, by the status that caused the retry."),
+            ("jira_request_failures_total", "failures", "Jira API requests that failed for good."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for entry in metrics[key]:
+                lines.append(f'{name}{{method="{entry["method"]}",endpoint="{entry["endpoint"]}",status="{entry["status"]}"}} {entry["count"]}')
+        lines.append("# HELP sync_objects_processed_total Objects processed by object type.")
+        lines.append("# TYPE sync_objects_processed_total counter")
+        for object_type, processed in metrics["objects"].items():
+            lines.append(f'sync_objects_processed_total{{object_type="{object_type}"}} {processed["count"]}')
+        lines.append("# HELP sync_objects_per_second Objects processed per second by object type.")
+        lines.append("# TYPE sync_objects_per_second gauge")
+        for object_type, processed in metrics["objects"].items():
+            lines.append(f'sync_objects_per_second{{object_type="{object_type}"}} {processed["per_second"]}')
+        lines.append("# HELP sync_phase_duration_seconds Time spent in each phase of the run.")
+        lines.append("# TYPE sync_phase_duration_seconds gauge")
+        for phase, seconds in metrics["phases"].items():
+            lines.append(f'sync_phase_duration_seconds{{phase="{phase}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Returns a short plain-text summary of the metrics, for the report email.
+        """
+        metrics = self.to_dict()
+        lines = [f"Run duration: {metrics['duration_seconds']:.1f} s"]
+        for phase, seconds in metrics["phases"].items():
+            lines.append(f"  {phase}: {seconds:.1f} s")
+        if metrics["objects"]:
+            lines.append("Objects processed:")
+            for object_type, processed in metrics["objects"].items():
+                lines.append(f"  {object_type}: {processed['count']} in {processed['seconds']:.1f} s ({processed['per_second']:.1f}/s)")
+        if metrics["requests"]:
+            lines.append("Jira requests:")
+            with self.lock:
+                histograms = dict(self.latencies)
+            for (method, endpoint), histogram in sorted(histograms.items()):
+                lines.append(
+                    f"  {method} {endpoint}: {histogram.count} attempts, {histogram.sum:.1f} s total, "
+                    f"p50 <= {histogram.quantile(0.5)} s, p95 <= {histogram.quantile(0.95)} s"
+                )
+        retries = sum(entry["count"] for entry in metrics["retries"])
+        failures = sum(entry["count"] for entry in metrics["failures"])
+        lines.append(f"Retries: {retries}, failed requests: {failures}")
+        return "\n".join(lines)
+
+    def write(self, prometheus_path=None, json_path=None):
+        """
+        Writes the metrics as Prometheus text and as JSON.
+        """
+        if prometheus_path:
+            with open(prometheus_path, "w") as prometheus_file:
+                prometheus_file.write(self.to_prometheus())
+        if json_path:
+            with open(json_path, "w") as json_file:
+                json.dump(self.to_dict(), json_file, indent=2)
+
+_metrics = Metrics()
+
+def get_metrics():
+    """
+    Returns the metrics of the current run.
+    """
+    return _metrics
+
+def timed_phase(phase):
+    """
+    Decorator that times every call of a function or coroutine function as the given phase.
+    """
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _metrics.time_phase(phase):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _metrics.time_phase(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
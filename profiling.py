@@ -0,0 +1,127 @@
+from config import get_env_variable
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+
+PROFILE_TOP_N = int(get_env_variable("PROFILE_TOP_N", 40))
+
+def per_thread_profiling_supported():
+    """
+    Checks whether a second thread can enable a profiler while another one is active, which is
+    not the case on interpreters where cProfile uses the process-wide sys.monitoring.
+    """
+    supported = []
+
+    def probe_thread():
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            supported.append(False)
+            return
+        profile.disable()
+        supported.append(True)
+
+    probe = cProfile.Profile()
+    probe.enable()
+    try:
+        thread = threading.Thread(target=probe_thread)
+        thread.start()
+        thread.join()
+    finally:
+        probe.disable()
+    return supported == [True]
+
+class RunProfiler:
+    """
+    Profiles a run with cProfile, in the main thread and in every thread started while it runs.
+
+    cProfile only sees the thread that enables it, so each new thread gets a profiler of its own on
+    its first profiling event; all of them are merged into one profile at the end. Where only one
+    profiler can be active at a time, only the main thread is profiled.
+
+    Args:
+        profile_path (str): Where to write the merged profile, readable with pstats or snakeviz.
+        summary_path (str): Where to write the top PROFILE_TOP_N functions and the phase timings.
+        metrics (Metrics): The run metrics whose phase timings go in the summary.
+    """
+
+    def __init__(self, profile_path, summary_path, metrics=None):
+        self.profile_path = profile_path
+        self.summary_path = summary_path
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.profiles = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        self.write()
+
+    def start(self):
+        if per_thread_profiling_supported():
+            threading.setprofile(self.profile_thread)
+        else:
+            logging.warning("This interpreter allows one active profiler only, profiling the main thread only")
+        self.main_profile = cProfile.Profile()
+        self.profiles.append(self.main_profile)
+        self.main_profile.enable()
+
+    def profile_thread(self, frame, event, arg):
+        # Called once in each new thread; enabling a profiler there replaces this hook
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Remove the hook, or it would fire again on every call in this thread
+            sys.setprofile(None)
+            logging.debug(f"Not profiling thread {threading.current_thread().name}: {e}")
+            return
+        with self.lock:
+            self.profiles.append(profile)
+
+    def stop(self):
+        threading.setprofile(None)
+        self.main_profile.disable()
+
+    def stats(self):
+        """
+        Returns the profiles of every thread merged into one pstats.Stats.
+        """
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def summary(self, stats):
+        """
+        Returns the phase timings and the top PROFILE_TOP_N functions by cumulative and own time.
+        """
+        output = io.StringIO()
+        output.write(f"Profiled {len(self.profiles)} threads\n\n")
+        if self.metrics is not None:
+            output.write("Phase timings (seconds, summed over threads, nested phases excluded):\n")
+            for phase, seconds in sorted(self.metrics.to_dict()["phases"].items(), key=lambda item: -item[1]):
+                output.write(f"  {phase:20} {seconds:10.2f}\n")
+            output.write("\n")
+        stats.stream = output
+        output.write(f"Top {PROFILE_TOP_N} functions by cumulative time:\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_N)
+        output.write(f"Top {PROFILE_TOP_N} functions by own time:\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP_N)
+        return output.getvalue()
+
+    def write(self):
+        stats = self.stats()
+        stats.dump_stats(self.profile_path)
+        with open(self.summary_path, "w") as summary_file:
+            summary_file.write(self.summary(stats))
+        logging.info(f"Wrote the profile to {self.profile_path} and its summary to {self.summary_path}")
@@ -0,0 +1,136 @@
+from config import get_env_variable, get_local_dir
+import json
+import logging
+import threading
+
+SITE_PREFIXES_FILE = get_env_variable("SITE_PREFIXES_FILE", get_local_dir() + "/site_prefixes.json")
+
+def parse_ipv4(ip):
+    """
+    Converts a dotted IPv4 address to an integer.
+
+    Returns:
+        int or None: The address, or None if the string is not a valid dotted IPv4 address.
+    """
+    octets = ip.split(".")
+    if len(octets) != 4:
+        return None
+    try:
+        a, b, c, d = map(int, octets)
+    except ValueError:
+        return None
+    if (a | b | c | d) >> 8:
+        return None
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+class SitePrefixIndex:
+    """
+    Longest-prefix-match index from IPv4 networks to sites.
+
+    Networks are grouped by prefix length, one dict per length keyed by the network address, and
+    matched longest prefix first. Only the leading octets covered by the longest prefix can change
+    the answer, so results are memoized on that part of the address string and repeat lookups within
+    the same network cost a single dict probe.
+
+    Args:
+        prefixes (dict): Maps networks in CIDR notation (e.g. "10.33.16.0/20") to site names.
+    """
+
+    def __init__(self, prefixes):
+        self.tables = {}
+        for cidr, site in prefixes.items():
+            network, _, length = cidr.partition("/")
+            prefix_length = int(length) if length else 32
+            address = parse_ipv4(network)
+            if address is None or not 0 <= prefix_length <= 32:
+                raise ValueError(f"Invalid network in site prefixes: {cidr}")
+            mask = (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF
+            self.tables.setdefault(prefix_length, {})[address & mask] = site
+        self.masks = [
+            ((0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF, self.tables[prefix_length])
+            for prefix_length in sorted(self.tables, reverse=True)
+        ]
+        network_octets = -(-max(self.tables, default=0) // 8)
+        self.host_octets = 4 - network_octets
+        self.host_suffix = ".0" * self.host_octets
+        self.resolved = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Builds the index from a JSON file mapping CIDR networks to site names.
+        """
+        with open(path) as prefixes_file:
+            return cls(json.load(prefixes_file))
+
+    def match(self, address):
+        """
+        Returns the site of the most specific network containing the integer address, or None.
+        """
+        for mask, table in self.masks:
+            site = table.get(address & mask)
+            if site is not None:
+                return site
+        return None
+
+    def lookup(self, ip):
+        """
+        Returns the site of the most specific network containing the IP, or None.
+        """
+        if ip.count(".") != 3:
+            return None
+        key = ip.rsplit(".", self.host_octets)[0] if self.host_octets else ip
+        try:
+            return self.resolved[key]
+        except KeyError:
+            pass
+        address = parse_ipv4(key + self.host_suffix)
+        site = self.match(address) if address is not None else None
+        self.resolved[key] = site
+        return site
+
+    def decide(self, ip_list):
+        """
+        Decides the site from the first IP in the list that belongs to a known network.
+
+        Args:
+            ip_list (list): A list of IP addresses.
+
+        Returns:
+            tuple: The site name and the IP it was decided from, or (None, None) if no IP matches.
+        """
+        for ip in ip_list:
+            try:
+                site = self.lookup(ip)
+            except Exception as e:
+                logging.error(f"Failed to parse IP: {ip}. Error: {e}")
+                continue
+            if site is not None:
+                return (site, ip)
+        return (None, None)
+
+    def decide_many(self, ip_lists):
+        """
+        Decides the site of several objects at once.
+
+        Args:
+            ip_lists (list): One list of IP addresses per object.
+
+        Returns:
+            list: One (site, ip) tuple per object, in the same order.
+        """
+        return [self.decide(ip_list) for ip_list in ip_lists]
+
+_site_index = None
+_site_index_lock = threading.Lock()
+
+def get_site_index():
+    """
+    Returns the shared site index, building it from SITE_PREFIXES_FILE on first use.
+    """
+    global _site_index
+    if _site_index is None:
+        with _site_index_lock:
+            if _site_index is None:
+                _site_index = SitePrefixIndex.from_file(SITE_PREFIXES_FILE)
+    return _site_index
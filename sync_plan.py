@@ -0,0 +1,257 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from jira_utils import *
+from logger import object_logger
+from metrics import get_metrics, timed_phase
+import json
+import logging
+import time
+
+def map_bounded(func, items, workers=1, thread_name_prefix=""):
+    """
+    Calls func on every item with at most `workers` threads and yields the results as they complete.
+
+    Items are pulled from the iterable lazily, so a streamed inventory is never fully queued up.
+
+    Args:
+        func (callable): The function to call with each item.
+        items (iterable): The items to process.
+        workers (int): The number of threads; 1 processes the items in order on the calling thread.
+        thread_name_prefix (str): Prefix for the worker thread names.
+
+    Yields:
+        The return value of each call.
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(func, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def resolve_hostnames_ahead(object_data_iter, object_type, chunk_size=PAGE_SIZE):
+    """
+    Passes objects through unchanged, resolving ahead of time the hostnames of those without an IP in Jira.
+
+    Objects are taken a chunk at a time and their hostnames resolved in one concurrent batch, so the
+    later per-object lookups are answered from the resolver's cache.
+
+    Args:
+        object_data_iter (iterable): Navlist entries whose attribute snapshots are already loaded.
+        object_type (str): The type of the objects (host, virtual guest, or device).
+        chunk_size (int): The number of objects per batch.
+
+    Yields:
+        dict: The navlist entries, in their original order.
+    """
+    chunk = []
+    for object_data in object_data_iter:
+        chunk.append(object_data)
+        if len(chunk) >= chunk_size:
+            get_ip_addresses([entry["label"] for entry in chunk if not jira_get_object_ip_details(entry["id"], object_type)])
+            yield from chunk
+            chunk = []
+    if chunk:
+        get_ip_addresses([entry["label"] for entry in chunk if not jira_get_object_ip_details(entry["id"], object_type)])
+        yield from chunk
+
+@timed_phase("decide")
+def plan_object(object_data, object_type, resolve_hostname=None):
+    """
+    Computes the IP, site and device type changes an object needs, without writing anything.
+
+    The current values are read from the object's attribute snapshot.
+
+    Args:
+        object_data (dict): The navlist entry of the object.
+        object_type (str): The type of object (host, virtual guest, or device).
+        resolve_hostname (callable): Looks up the IP of the object's hostname when Jira has none;
+            defaults to get_ip_address.
+
+    Returns:
+        dict: The plan entry, with a "changes" dict that is empty when the object is up to date.
+    """
+    object_id = object_data["id"]
+    host_name = object_data["label"]
+    changes = {}
+
+    # IP Address
+    object_ip_list = jira_get_object_ip_details(object_id, object_type)
+    if not object_ip_list:
+        object_logger.info("No IP set in jira for %s, getting IP from hostname", object_id)
+        ip_address = (resolve_hostname or get_ip_address)(host_name)
+        if ip_address:
+            object_logger.info("Found IP: %s", ip_address)
+            object_ip_list.append(ip_address)
+            changes["ip"] = {"from": None, "to": ip_address}
+
+    # Site
+    if object_ip_list:
+        host_site, ip_used = decide_site_from_ip(object_ip_list)
+        if host_site is not None:
+            object_logger.info("%s decided for %s from %s", host_site, object_id, ip_used)
+            if not check_if_site_needs_update(object_type, object_id, host_site):
+                changes["site"] = {"from": jira_get_object_site(object_id, object_type), "to": host_site}
+            else:
+                object_logger.info("Site already set for %s", object_id)
+    else:
+        object_logger.info("Failed to decide site for %s from %s", object_id, object_ip_list)
+
+    # Device Type
+    if object_type in ["host", "virtual guest"]:
+        operating_system = jira_get_object_os(object_id, object_type)
+    elif object_type == "device":
+        operating_system = jira_get_object_model(object_id, object_type)
+    else:
+        operating_system = None
+    if operating_system:
+        device_type = decide_device_type_from_os(operating_system, object_type)
+        if device_type is not None:
+            object_logger.info("%s decided for %s", device_type, object_id)
+            if not check_if_device_type_needs_update(object_type, object_id, device_type):
+                changes["device_type"] = {"from": jira_get_object_device_type(object_id, object_type), "to": device_type}
+            else:
+                object_logger.info("Device type already set for %s", object_id)
+
+    return {"object_id": object_id, "label": host_name, "object_type": object_type, "changes": changes}
+
+def queue_plan_changes(plan_entry, write_buffer):
+    """
+    Queues the site and device type changes of a plan entry on the object's write buffer.
+    """
+    object_id = plan_entry["object_id"]
+    object_type = plan_entry["object_type"]
+    changes = plan_entry["changes"]
+    if "site" in changes:
+        jira_set_site(object_id, object_type, changes["site"]["to"], write_buffer)
+    if "device_type" in changes:
+        jira_set_device_type(object_id, object_type, changes["device_type"]["to"], write_buffer)
+
+@timed_phase("write")
+def apply_plan_entry(plan_entry):
+    """
+    Writes the changes of a plan entry to Jira as a single object update.
+
+    Returns:
+        bool: True if every change was written or there was nothing to change, False otherwise.
+    """
+    write_buffer = ObjectWriteBuffer(plan_entry["object_id"])
+    changes = plan_entry["changes"]
+    ip_queued = True
+    if "ip" in changes:
+        ip_queued = jira_set_ip_address(plan_entry["object_type"], plan_entry["object_id"], changes["ip"]["to"], write_buffer)
+    queue_plan_changes(plan_entry, write_buffer)
+    return write_buffer.flush() and ip_queued
+
+@timed_phase("write")
+async def apply_plan_entry_async(plan_entry):
+    """
+    Async version of apply_plan_entry.
+    """
+    write_buffer = ObjectWriteBuffer(plan_entry["object_id"])
+    changes = plan_entry["changes"]
+    ip_queued = True
+    if "ip" in changes:
+        ip_queued = await jira_set_ip_address_async(plan_entry["object_type"], plan_entry["object_id"], changes["ip"]["to"], write_buffer)
+    queue_plan_changes(plan_entry, write_buffer)
+    return await write_buffer.flush_async() and ip_queued
+
+def plan_object_safely(object_data, object_type, status=None):
+    """
+    Plans a single object, logging and containing any error, and drops its snapshot afterwards.
+    Errors are counted in status, if given.
+
+    Returns:
+        dict or None: The plan entry, or None if planning failed.
+    """
+    object_id = object_data["id"]
+    try:
+        object_logger.info("Planning %s, %s", object_id, object_data['label'])
+        return plan_object(object_data, object_type)
+    except Exception as e:
+        logging.error(f"Error planning {object_type} {object_id}, {object_data['label']}: {e}")
+        if status is not None:
+            status.object_failed()
+        return None
+    finally:
+        clear_attribute_snapshots(object_id)
+
+def build_plan(object_types, workers=1, updated_since=None, status=None):
+    """
+    Phase one of the two-phase sync: computes the desired state of every object and keeps only
+    the objects whose current attributes differ from it.
+
+    Args:
+        object_types (list): The object types to plan (host, virtual guest, or device).
+        workers (int): The number of objects planned concurrently.
+        updated_since (datetime): Only plan objects updated after this time.
+        status (SweepStatus): Counts the pages and objects that failed.
+
+    Returns:
+        dict: The plan, with the changed objects and a per-type summary.
+    """
+    plan = {"created": datetime.now(timezone.utc).isoformat(), "summary": {}, "objects": []}
+    for object_type in object_types:
+        logging.info(f"Planning {object_type} objects")
+        started = time.perf_counter()
+        planned = 0
+        changed = 0
+        object_data_iter = resolve_hostnames_ahead(
+            jira_iter_objects(object_type, include_attributes=True, updated_since=updated_since, status=status), object_type
+        )
+        for plan_entry in map_bounded(lambda object_data: plan_object_safely(object_data, object_type, status), object_data_iter, workers, object_type):
+            planned += 1
+            if plan_entry and plan_entry["changes"]:
+                changed += 1
+                plan["objects"].append(plan_entry)
+        plan["summary"][object_type] = {"planned": planned, "changed": changed}
+        get_metrics().record_objects(object_type, planned, time.perf_counter() - started)
+        logging.info(f"Planned {planned} {object_type} objects, {changed} need changes")
+    return plan
+
+def write_plan(plan, path):
+    """
+    Writes a plan to a JSON file.
+    """
+    with open(path, "w") as plan_file:
+        json.dump(plan, plan_file, indent=2)
+    logging.info(f"Wrote plan with {len(plan['objects'])} changed objects to {path}")
+
+def apply_plan(plan, workers=1, status=None):
+    """
+    Phase two of the two-phase sync: writes the changes of every object in the plan.
+
+    Args:
+        plan (dict): A plan built by build_plan.
+        workers (int): The number of objects updated concurrently.
+        status (SweepStatus): Counts the objects whose update failed.
+
+    Returns:
+        int: The number of objects whose update failed.
+    """
+    def apply_safely(plan_entry):
+        try:
+            return apply_plan_entry(plan_entry)
+        except Exception as e:
+            logging.error(f"Error applying plan to {plan_entry['object_type']} {plan_entry['object_id']}, {plan_entry['label']}: {e}")
+            return False
+
+    failures = 0
+    for succeeded in map_bounded(apply_safely, plan["objects"], workers, "apply"):
+        if not succeeded:
+            failures += 1
+            if status is not None:
+                status.object_failed()
+    logging.info(f"Applied plan to {len(plan['objects'])} objects, {failures} failed")
+    return failures
@@ -0,0 +1,87 @@
+from config import get_env_variable
+from datetime import datetime, timedelta, timezone
+import json
+import logging
+import os
+
+FULL_SWEEP_INTERVAL_DAYS = float(get_env_variable("FULL_SWEEP_INTERVAL_DAYS", 7))
+WATERMARK_OVERLAP_MINUTES = float(get_env_variable("WATERMARK_OVERLAP_MINUTES", 60))
+
+def load_sync_state(path):
+    """
+    Loads the watermarks saved by the last successful run.
+
+    Args:
+        path (str): Path to the state file.
+
+    Returns:
+        dict: The saved state, or an empty dict if there is none or it cannot be read.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to read sync state from {path}, running a full sweep: {e}")
+        return {}
+
+def save_sync_state(state, path):
+    """
+    Saves the sync state, replacing the file atomically so a crash never leaves it half written.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as state_file:
+        json.dump(state, state_file, indent=2)
+    os.replace(temp_path, path)
+
+def parse_timestamp(value):
+    """
+    Parses a timestamp saved in the state as an aware UTC datetime. Timestamps saved without a
+    timezone by earlier versions were in local time.
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()
+    return timestamp.astimezone(timezone.utc)
+
+def get_updated_since(state, force_full=False):
+    """
+    Decides whether a run can be incremental.
+
+    A full sweep is run when forced, when there is no watermark yet, or when the last full sweep
+    is older than FULL_SWEEP_INTERVAL_DAYS. Otherwise the watermark is moved back by
+    WATERMARK_OVERLAP_MINUTES so that objects updated while the last run was starting are not missed.
+
+    Args:
+        state (dict): The state loaded with load_sync_state.
+        force_full (bool): Always run a full sweep.
+
+    Returns:
+        datetime or None: Only objects updated after this aware UTC time need processing, or None for a full sweep.
+    """
+    if force_full or "watermark" not in state or "last_full_sweep" not in state:
+        return None
+    last_full_sweep = parse_timestamp(state["last_full_sweep"])
+    if datetime.now(timezone.utc) - last_full_sweep > timedelta(days=FULL_SWEEP_INTERVAL_DAYS):
+        logging.info(f"Last full sweep was at {last_full_sweep}, running a full sweep")
+        return None
+    return parse_timestamp(state["watermark"]) - timedelta(minutes=WATERMARK_OVERLAP_MINUTES)
+
+def record_successful_run(state, started_at, full_sweep):
+    """
+    Advances the watermark to the start of a run that processed every object without an error.
+
+    Args:
+        state (dict): The state to update.
+        started_at (datetime): When the run started, as an aware UTC datetime.
+        full_sweep (bool): Whether the run processed every object.
+
+    Returns:
+        dict: The updated state.
+    """
+    started_at = started_at.astimezone(timezone.utc)
+    state["watermark"] = started_at.isoformat()
+    if full_sweep:
+        state["last_full_sweep"] = started_at.isoformat()
+    return state
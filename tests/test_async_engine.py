@@ -0,0 +1,116 @@
+"""
+Acceptance test of the async engine: runs the site and device type sync with both engines against
+the local mock Jira server and checks that they read and write the same things.
+
+Run with: python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from mock_server import ENVIRONMENT, MockInventory, offline_dns_query, start_server
+
+OBJECTS = 60
+WORKERS = 4
+OBJECT_TYPES = ["host", "device", "virtual guest"]
+
+class AsyncEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = start_server(MockInventory(OBJECTS))
+        url = f"http://127.0.0.1:{cls.server.server_port}"
+        os.environ.update(ENVIRONMENT, JIRA_URL=url, VEEAM_URL=url, JIRA_RATE_LIMIT="0")
+
+        # The modules read their settings on import, so they are imported once the server is up
+        import dns_resolver
+        import jira_utils
+        import main
+        from metrics import get_metrics
+        dns_resolver.DnsResolver.query = offline_dns_query
+        cls.dns_resolver = dns_resolver
+        cls.jira_utils = jira_utils
+        cls.main = main
+        cls.metrics = get_metrics()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def run_engine(self, engine, rate_429=0.0):
+        """
+        Runs one engine against a fresh copy of the inventory.
+
+        Returns:
+            tuple: The final inventory, the requests made by route, and the run's sweep status.
+        """
+        inventory = MockInventory(OBJECTS)
+        self.server.inventory = inventory
+        self.server.rate_429 = rate_429
+
+        jira_utils = self.jira_utils
+        jira_utils.configure_inventory_cache(None)
+        jira_utils.clear_attribute_snapshots(None)
+        jira_utils._network_objects = None
+        jira_utils._network_objects_failed = False
+        jira_utils._network_create_async_locks.clear()
+        self.dns_resolver.configure_resolver(None)
+        self.metrics.reset()
+
+        status = jira_utils.SweepStatus()
+        if engine == "async":
+            asyncio.run(self.main.run_site_location_update_async(OBJECT_TYPES, WORKERS, None, status))
+        else:
+            for object_type in OBJECT_TYPES:
+                self.main.jira_update_site_location(object_type, WORKERS, None, status)
+        requests = {route: count for route, count in inventory.counts.items() if route != "429"}
+        return inventory, requests, status
+
+    def final_state(self, inventory):
+        """
+        Returns every object's attributes by display value, so network objects created in a
+        different order by the two engines compare equal.
+        """
+        return {
+            jira_object["label"]: {
+                attribute_id: sorted(inventory.display_value(value["value"]) for value in values)
+                for attribute_id, values in jira_object["attributes"].items()
+            }
+            for jira_object in inventory.objects.values()
+        }
+
+    def test_reads_and_writes_match_sync_engine(self):
+        sync_inventory, sync_requests, sync_status = self.run_engine("sync")
+        async_inventory, async_requests, async_status = self.run_engine("async")
+
+        self.assertTrue(sync_status.complete)
+        self.assertTrue(async_status.complete)
+        self.assertGreater(sync_requests.get("PUT /object/{id}", 0), 0)
+        self.assertEqual(async_requests, sync_requests)
+        self.assertEqual(self.final_state(async_inventory), self.final_state(sync_inventory))
+
+    def test_retries_throttled_requests_like_sync_engine(self):
+        expected_inventory, _, _ = self.run_engine("sync")
+        expected_state = self.final_state(expected_inventory)
+
+        for engine in ("sync", "async"):
+            with self.subTest(engine=engine):
+                inventory, _, status = self.run_engine(engine, rate_429=0.2)
+                metrics = self.metrics.to_dict()
+                throttled = inventory.counts["429"]
+                retries = sum(entry["count"] for entry in metrics["retries"] if entry["status"] == "429")
+
+                self.assertGreater(throttled, 0)
+                # Every 429 is retried and no request gives up
+                self.assertEqual(retries, throttled)
+                self.assertEqual(metrics["failures"], [])
+                self.assertTrue(status.complete)
+                self.assertEqual(self.final_state(inventory), expected_state)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
 from config import get_env_variable
+from veeam_cache import VeeamReportCache, VEEAM_REPORT_MAX_AGE_HOURS
 import base64
 import requests
 import logging
 from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+import codecs
+import os
 import re
 import json
 
@@ -36,107 +40,425 @@ VEEAM_PASSWORD = get_and_encode_password("VEEAM_PASSWORD")
 
 LOGIN_URL = VEEAM_URL + "/api/Login/LoginByPassword"
 REPORT_URL = VEEAM_URL + "/api/Licensing/CreateMonthlyReportPreview"
+# "stream" parses the report incrementally as it downloads, "tree" builds the full BeautifulSoup tree first
+VEEAM_PARSE_MODE = get_env_variable("VEEAM_PARSE_MODE", "stream")
+REPORT_CHUNK_SIZE = 64 * 1024
+
+# On-disk cache of downloaded reports, enabled with configure_report_cache
+_report_cache = None
+
+CSRF_TOKEN_PATTERN = re.compile(r"var CSRFToken = '(.*?)';")
+SESSION_EXPIRED_STATUS_CODES = {401, 403}
+
 HEADERS = {
     "accept": "*/*",
     "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
     "Accept-Encoding": "gzip, deflate, br",
 }
 
+def configure_report_cache(directory):
+    """
+    Enables the on-disk Veeam report cache in the given directory, or disables it if directory is None.
+
+    Returns:
+        VeeamReportCache or None: The cache now in use.
+    """
+    global _report_cache
+    _report_cache = VeeamReportCache(directory) if directory else None
+    return _report_cache
+
 def login_to_veeam(username, password):
     """
     Log in to the Veeam service and return the session object.
     """
-    with requests.Session() as client:
-        response = client.post(
-            LOGIN_URL, headers=HEADERS, verify=False, data={"username": username, "password": password}
-        )
-        parsed_content = json.loads(response.content.decode("utf-8"))
-        if parsed_content.get("success"):
-            logging.info(f"Connected to Veeam as: {username}")
-            return client
-        else:
-            logging.error(f"Failed to connect to Veeam: {parsed_content.get('errorMessage')}")
-            return None
+    client = requests.Session()
+    response = client.post(
+        LOGIN_URL, headers=HEADERS, verify=False, data={"username": username, "password": password}
+    )
+    parsed_content = json.loads(response.content.decode("utf-8"))
+    if parsed_content.get("success"):
+        logging.info(f"Connected to Veeam as: {username}")
+        return client
+    else:
+        logging.error(f"Failed to connect to Veeam: {parsed_content.get('errorMessage')}")
+        client.close()
+        return None
 
 def get_csrf_token(client):
     """
     Retrieve the CSRF token from the Veeam home page.
+
+    Returns:
+        str or None: The token, or None if the home page has none, as when the session expired.
     """
     home_page = client.get(VEEAM_URL, headers=HEADERS, verify=False, allow_redirects=False)
-    soup = BeautifulSoup(home_page.text, "html.parser")
-    script_tag = soup.find("script", string=re.compile("CSRFToken"))
-    csrf_token = re.search(r"var CSRFToken = '(.*?)';", script_tag.string).group(1)
+    match = CSRF_TOKEN_PATTERN.search(home_page.text)
+    if match is None:
+        return None
+    csrf_token = match.group(1)
     logging.info(f"CSRF Token: {csrf_token}")
     return csrf_token
 
-def get_backup_report(client, csrf_token):
+def request_backup_report(client, csrf_token, stream=False):
     """
-    Get the backup report from Veeam.
+    Request the backup report from Veeam and return the response.
     """
     headers = HEADERS.copy()
     headers["X-Csrf-Token"] = csrf_token
     headers["content-type"] = ""
     cookie = client.cookies.get_dict()
     headers["Cookie"] = "; ".join([f"{k}={v}" for k, v in cookie.items()])
-    
-    export_response = client.post(REPORT_URL, headers=headers, verify=False)
+
+    # A redirect means the session expired and Veeam sends us to the login page
+    return client.post(REPORT_URL, headers=headers, verify=False, stream=stream, allow_redirects=False)
+
+class VeeamClient:
+    """
+    Long-lived Veeam session that keeps its cookies and CSRF token between report requests.
+
+    It logs in on first use and logs in again only when Veeam rejects the session, so a retry or a
+    second report fetch costs a single request. Veeam rejects an expired session with 401 or 403,
+    or by redirecting to its login page; a login page returned as the report itself is only
+    noticed once parsed, see check_backup_report.
+
+    Args:
+        username (str): The Veeam user.
+        password (str): The Base64 encoded password.
+    """
+
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.session = None
+        self.csrf_token = None
+
+    def login(self):
+        """
+        Logs in with a new session and fetches its CSRF token.
+
+        Returns:
+            bool: True if the session is ready for requests.
+        """
+        self.close()
+        session = login_to_veeam(self.username, self.password)
+        if session is None:
+            return False
+        csrf_token = get_csrf_token(session)
+        if csrf_token is None:
+            logging.error("Failed to find the CSRF token on the Veeam home page")
+            session.close()
+            return False
+        self.session = session
+        self.csrf_token = csrf_token
+        return True
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+        self.session = None
+        self.csrf_token = None
+
+    def session_expired(self, response):
+        return response.status_code in SESSION_EXPIRED_STATUS_CODES or response.is_redirect
+
+    def request_report(self, stream=False):
+        """
+        Requests the backup report, logging in again once if the session has expired.
+
+        Returns:
+            requests.Response: The report response.
+
+        Raises:
+            RuntimeError: If logging in failed.
+            requests.HTTPError: If Veeam answered with an error status.
+        """
+        if self.session is None and not self.login():
+            raise RuntimeError("Failed to log in to Veeam")
+        response = request_backup_report(self.session, self.csrf_token, stream)
+        if self.session_expired(response):
+            response.close()
+            logging.info(f"Veeam session expired with status {response.status_code}, logging in again")
+            if not self.login():
+                raise RuntimeError("Failed to log in to Veeam again after the session expired")
+            response = request_backup_report(self.session, self.csrf_token, stream)
+            if self.session_expired(response):
+                response.close()
+                raise RuntimeError(f"Veeam rejected the new session with status {response.status_code}")
+        if not response.ok:
+            response.close()
+            response.raise_for_status()
+        return response
+
+_veeam_client = None
+
+def get_veeam_client():
+    """
+    Returns the shared Veeam client, creating it on first use.
+    """
+    global _veeam_client
+    if _veeam_client is None:
+        _veeam_client = VeeamClient(VEEAM_USERNAME, VEEAM_PASSWORD)
+    return _veeam_client
+
+def get_backup_report(client):
+    """
+    Get the backup report from Veeam.
+    """
+    export_response = client.request_report()
     return BeautifulSoup(export_response.text, "html.parser")
 
-def find_tables_between_tags(start_tag, end_tag_name="p"):
-    """Find all tables between the start tag and the next occurrence of end_tag_name."""
-    tables = []
-    current_tag = start_tag.find_next()
-    while current_tag and current_tag.name != end_tag_name:
-        if current_tag.name == "table":
-            tables.append(current_tag)
-        current_tag = current_tag.find_next()
-    return tables
-
-def find_tables_until_end(tag):
-    """Find all tables after the given tag until the end of the document."""
-    tables = []
-    current_tag = tag.find_next()
-    while current_tag:
-        if current_tag.name == "table":
-            tables.append(current_tag)
-        current_tag = current_tag.find_next()
-    return tables
+def check_backup_report(server_names, final_backup_locations):
+    """
+    Checks that a parsed report lists backup servers and VMs.
+
+    Raises:
+        ValueError: If it lists none, as when Veeam answered with its login page or an error page.
+    """
+    if not server_names or not final_backup_locations:
+        raise ValueError(f"The Veeam report lists {len(server_names)} servers and {len(final_backup_locations)} VMs, it is not a backup report")
+
+def normalize_vm_name(vm_name):
+    """
+    Normalizes a VM name from the report to the host name used in Jira.
+    """
+    return vm_name.lower().replace(".hypertec-group.com", "")
+
+def parse_backup_report(soup):
+    """
+    Maps every VM in the report to the backup server it is listed under.
+
+    Each server in the report is a <p> header followed by the tables of its VMs, so a single pass
+    over the <p> and <table> tags in document order assigns every table to the last header seen.
+
+    Args:
+        soup (BeautifulSoup): The parsed report.
+
+    Returns:
+        tuple: The server names in report order, and a dict mapping VM names to their server name.
+    """
+    server_names = []
+    final_backup_locations = {}
+    server_name = None
+    for tag in soup.find_all(["p", "table"]):
+        if tag.name == "p":
+            server_name = tag.get_text(strip=True).split(" ")[0]
+            server_names.append(server_name)
+        elif server_name is not None:
+            for row in tag.find_all("tr")[1:]:  # Skip the header row
+                vm_name_cell = row.find("td")
+                if vm_name_cell:
+                    final_backup_locations[normalize_vm_name(vm_name_cell.get_text(strip=True))] = server_name
+    return server_names, final_backup_locations
+
+class BackupReportParser(HTMLParser):
+    """
+    Streaming parser for the Veeam monthly report.
+
+    Follows the same layout as parse_backup_report: a <p> header names the backup server, and the
+    first cell of every row but the first in the tables that follow holds a VM name. Only the text
+    of the current header or cell is held, so memory stays bounded whatever the report size.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.server_names = []
+        self.server_name = None
+        self.pairs = []
+        self.header_text = None
+        self.table_depth = 0
+        self.row_count = 0
+        self.row_has_cell = False
+        self.cell_text = None
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        self.end_text()
+        if tag == "p":
+            self.header_text = []
+        elif tag == "table":
+            self.end_header()
+            if self.table_depth == 0:
+                self.row_count = 0
+            self.table_depth += 1
+        elif tag == "tr" and self.table_depth:
+            self.end_cell()
+            self.row_count += 1
+            self.row_has_cell = False
+        elif tag == "td" and self.table_depth and self.row_count > 1 and not self.row_has_cell:
+            self.row_has_cell = True
+            self.cell_text = []
+
+    def handle_endtag(self, tag):
+        self.end_text()
+        if tag == "p":
+            self.end_header()
+        elif tag == "td":
+            self.end_cell()
+        elif tag == "table" and self.table_depth:
+            self.end_cell()
+            self.table_depth -= 1
+
+    def handle_data(self, data):
+        # A text node can arrive in several pieces when it spans chunks
+        if self.header_text is not None or self.cell_text is not None:
+            self.text.append(data)
+
+    def handle_comment(self, data):
+        self.end_text()
+
+    def end_text(self):
+        if self.text:
+            text = "".join(self.text).strip()
+            self.text = []
+            if text:
+                if self.header_text is not None:
+                    self.header_text.append(text)
+                if self.cell_text is not None:
+                    self.cell_text.append(text)
+
+    def end_header(self):
+        if self.header_text is not None:
+            self.server_name = "".join(self.header_text).split(" ")[0]
+            self.server_names.append(self.server_name)
+            self.header_text = None
+
+    def end_cell(self):
+        if self.cell_text is not None:
+            if self.server_name is not None:
+                self.pairs.append((normalize_vm_name("".join(self.cell_text)), self.server_name))
+            self.cell_text = None
+
+    def iter_pairs(self, chunks):
+        """
+        Feeds text chunks to the parser and yields (vm_name, server_name) pairs as they are parsed.
+        """
+        for chunk in chunks:
+            self.feed(chunk)
+            if self.pairs:
+                yield from self.pairs
+                self.pairs = []
+        self.close()
+        self.end_text()
+        self.end_header()
+        self.end_cell()
+        yield from self.pairs
+        self.pairs = []
+
+def decode_chunks(chunks, encoding=None):
+    """
+    Incrementally decodes byte chunks to text.
+    """
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+def stream_backup_report(client):
+    """
+    Downloads and parses the backup report incrementally, without holding the whole report in memory.
+
+    Returns:
+        tuple: The server names in report order, and a dict mapping VM names to their server name.
+    """
+    parser = BackupReportParser()
+    final_backup_locations = {}
+    with client.request_report(stream=True) as export_response:
+        chunks = decode_chunks(export_response.iter_content(REPORT_CHUNK_SIZE), export_response.encoding)
+        for vm_name, server_name in parser.iter_pairs(chunks):
+            final_backup_locations[vm_name] = server_name
+    return parser.server_names, final_backup_locations
+
+def read_chunks(path, chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Reads a file in byte chunks.
+    """
+    with open(path, "rb") as report_file:
+        while chunk := report_file.read(chunk_size):
+            yield chunk
+
+def parse_backup_report_file(path, encoding=None):
+    """
+    Parses a report saved to disk, in the mode set by VEEAM_PARSE_MODE.
+
+    Returns:
+        tuple: The server names in report order, and a dict mapping VM names to their server name.
+    """
+    if VEEAM_PARSE_MODE == "tree":
+        with open(path, encoding=encoding or "utf-8", errors="replace") as report_file:
+            return parse_backup_report(BeautifulSoup(report_file, "html.parser"))
+    parser = BackupReportParser()
+    final_backup_locations = dict(parser.iter_pairs(decode_chunks(read_chunks(path), encoding)))
+    return parser.server_names, final_backup_locations
+
+def fetch_cached_backup_report(client, report_cache):
+    """
+    Downloads the backup report to the cache and parses it, unless a report with the same content
+    was parsed before.
+
+    Returns:
+        tuple: The server names in report order, and a dict mapping VM names to their server name.
+
+    Raises:
+        ValueError: If the report lists no servers or VMs; it is not cached.
+    """
+    with client.request_report(stream=True) as export_response:
+        encoding = export_response.encoding
+        digest, raw_path = report_cache.download(export_response.iter_content(REPORT_CHUNK_SIZE))
+
+    parsed = report_cache.get(digest)
+    if parsed is not None:
+        logging.info(f"Veeam report {digest} is unchanged, reusing its parsed backup locations")
+        os.remove(raw_path)
+        report_cache.mark_fetched(digest)
+        return parsed["server_names"], parsed["backup_locations"]
+
+    try:
+        server_names, final_backup_locations = parse_backup_report_file(raw_path, encoding)
+        # An error or login page parses to nothing; caching it would hide the real report
+        check_backup_report(server_names, final_backup_locations)
+    except BaseException:
+        os.remove(raw_path)
+        raise
+    report_cache.store(digest, raw_path, {"server_names": server_names, "backup_locations": final_backup_locations})
+    return server_names, final_backup_locations
 
 def veeam_get_backup_report():
+    if _report_cache is not None:
+        cached = _report_cache.get_recent()
+        if cached is not None:
+            logging.info(f"Using the Veeam report downloaded in the last {VEEAM_REPORT_MAX_AGE_HOURS} hours")
+            return cached["backup_locations"]
+
     retry_count = 0
     while retry_count <= 3:
         try:
-            client = login_to_veeam(VEEAM_USERNAME, VEEAM_PASSWORD)
-            if not client:
+            client = get_veeam_client()
+            if client.session is None and not client.login():
                 return None
 
-            csrf_token = get_csrf_token(client)
-            soup = get_backup_report(client, csrf_token)
-            server_names = [
-                tag.get_text(strip=True).split(" ")[0]
-                for tag in soup.find_all("p")
-            ]
+            if _report_cache is not None:
+                server_names, final_backup_locations = fetch_cached_backup_report(client, _report_cache)
+            elif VEEAM_PARSE_MODE == "tree":
+                soup = get_backup_report(client)
+                server_names, final_backup_locations = parse_backup_report(soup)
+                check_backup_report(server_names, final_backup_locations)
+            else:
+                server_names, final_backup_locations = stream_backup_report(client)
+                check_backup_report(server_names, final_backup_locations)
             logging.info(
                 f"parced server names from Veeam Report: {server_names}"
             )
-            final_backup_locations = {}
-            for index, server_name in enumerate(server_names):
-                server_tag = soup.find("p", string=lambda text: server_name in text)
-                if not server_tag:
-                    continue
-                if index == len(server_names) - 1:
-                    tables = find_tables_until_end(server_tag)
-                else:
-                    tables = find_tables_between_tags(server_tag)
-
-                for vm_table in tables:
-                    for row in vm_table.find_all("tr")[1:]:  # Skip the header row
-                        vm_name_cell = row.find("td")
-                        if vm_name_cell:
-                            vm_name = vm_name_cell.get_text(strip=True).lower().replace(".hypertec-group.com", "")
-                            final_backup_locations[vm_name] = server_name
             return final_backup_locations
 
+        except ValueError as e:
+            # Most likely the login page of an expired session, so the next attempt logs in again
+            logging.error(f"Failed to get Veeam Report List, logging in again: \n {e}")
+            client.close()
+            retry_count += 1
         except Exception as e:
             logging.error(f"Failed to get Veeam Report List with exception: \n {e}")
             retry_count += 1
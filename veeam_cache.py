@@ -0,0 +1,123 @@
+from config import get_env_variable
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+VEEAM_REPORT_MAX_AGE_HOURS = float(get_env_variable("VEEAM_REPORT_MAX_AGE_HOURS", 24))
+# At least the latest report is always kept
+VEEAM_REPORT_CACHE_KEEP = max(int(get_env_variable("VEEAM_REPORT_CACHE_KEEP", 3)), 1)
+
+class VeeamReportCache:
+    """
+    On-disk cache of Veeam monthly reports, keyed by the SHA-256 of the raw report.
+
+    Each report is kept as "<sha256>.html" next to "<sha256>.json", which holds the parsed server
+    names and backup locations. An index records when each report was last downloaded, so a
+    report younger than the max age is reused without contacting Veeam, and a downloaded report
+    whose content was seen before is not parsed again.
+
+    Args:
+        directory (str): The cache directory; it is created if missing.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return {"latest": None, "reports": {}}
+        try:
+            with open(self.index_path) as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read the Veeam report cache index, ignoring the cache: {e}")
+            return {"latest": None, "reports": {}}
+
+    def save_index(self, index):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as index_file:
+            json.dump(index, index_file, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def get(self, digest):
+        """
+        Returns the parsed report with the given hash, or None if it is not cached.
+        """
+        parsed_path = os.path.join(self.directory, f"{digest}.json")
+        if not os.path.exists(parsed_path):
+            return None
+        try:
+            with open(parsed_path) as parsed_file:
+                return json.load(parsed_file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read cached Veeam report {digest}: {e}")
+            return None
+
+    def get_recent(self, max_age_hours=VEEAM_REPORT_MAX_AGE_HOURS):
+        """
+        Returns the parsed latest report if it was downloaded less than max_age_hours ago, or None.
+        """
+        index = self.load_index()
+        digest = index["latest"]
+        if digest is None or digest not in index["reports"]:
+            return None
+        fetched_at = datetime.fromisoformat(index["reports"][digest]["fetched_at"])
+        if datetime.now() - fetched_at > timedelta(hours=max_age_hours):
+            return None
+        return self.get(digest)
+
+    def download(self, chunks):
+        """
+        Writes the raw report to a temporary file in the cache directory while hashing it.
+
+        Args:
+            chunks (iterable): The report body as byte chunks.
+
+        Returns:
+            tuple: The SHA-256 hex digest of the report and the path of the temporary file.
+        """
+        digest = hashlib.sha256()
+        file_descriptor, temp_path = tempfile.mkstemp(suffix=".part", dir=self.directory)
+        try:
+            with os.fdopen(file_descriptor, "wb") as raw_file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    raw_file.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return digest.hexdigest(), temp_path
+
+    def store(self, digest, raw_path, parsed):
+        """
+        Keeps the raw report downloaded to raw_path and its parsed content under the report's hash.
+        """
+        os.replace(raw_path, os.path.join(self.directory, f"{digest}.html"))
+        parsed_path = os.path.join(self.directory, f"{digest}.json")
+        with open(parsed_path + ".tmp", "w") as parsed_file:
+            json.dump(parsed, parsed_file)
+        os.replace(parsed_path + ".tmp", parsed_path)
+        self.mark_fetched(digest)
+
+    def mark_fetched(self, digest):
+        """
+        Records the report as the latest download and drops all but the VEEAM_REPORT_CACHE_KEEP newest reports.
+        """
+        index = self.load_index()
+        index["latest"] = digest
+        index["reports"][digest] = {"fetched_at": datetime.now().isoformat()}
+        newest = sorted(index["reports"], key=lambda key: index["reports"][key]["fetched_at"], reverse=True)
+        for old_digest in newest[VEEAM_REPORT_CACHE_KEEP:]:
+            if old_digest == digest:
+                continue
+            del index["reports"][old_digest]
+            for extension in ("html", "json"):
+                old_path = os.path.join(self.directory, f"{old_digest}.{extension}")
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+        self.save_index(index)